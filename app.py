@@ -1,8 +1,17 @@
 import streamlit as st
 import pandas as pd
-from utils.fetch_data import fetch_raw_leads, fetch_enriched_leads, rank_enriched_leads
+from utils.fetch_data import SEARCH_TOP_K, SearchSession, find_and_rank_leads
+from utils.ranking_cache import get_ranking_cache
+from utils.ranking_cube import lookup_ranking
+from utils.search_options import (
+    SECTORS, REGIONS, PURPOSES, COMPANY_SIZE_OPTIONS, INVESTMENT_STAGE_OPTIONS, REVENUE_RANGE_OPTIONS,
+    BUYER_TYPE_OPTIONS, PRODUCT_CATEGORY_OPTIONS, ALLIANCE_TYPE_OPTIONS, SYNERGY_AREA_OPTIONS, NICHE_OPTIONS,
+    COMPETITOR_FOCUS_OPTIONS,
+)
 import datetime
 
+RESULTS_PAGE_SIZE = 200 # Ranked leads shown (and materialized) per page
+
 # --- Initialize Session State Variables ---
 if 'sector' not in st.session_state:
     st.session_state.sector = None
@@ -22,6 +31,18 @@ if 'selected_company_names' not in st.session_state:
     st.session_state.selected_company_names = []
 if 'detailed_display_df' not in st.session_state:
     st.session_state.detailed_display_df = pd.DataFrame()
+if 'ranking' not in st.session_state:
+    st.session_state.ranking = None
+if 'results_page' not in st.session_state:
+    st.session_state.results_page = 1
+if 'base_ranking' not in st.session_state:
+    st.session_state.base_ranking = None
+if 'score_breakdown_df' not in st.session_state:
+    st.session_state.score_breakdown_df = pd.DataFrame()
+if 'search_session' not in st.session_state:
+    st.session_state.search_session = None
+if 'rerank_pending' not in st.session_state:
+    st.session_state.rerank_pending = False
 
 # --- Helper function to clear results ---
 def clear_results():
@@ -30,6 +51,52 @@ def clear_results():
     st.session_state.selected_company_names = []
     st.session_state.detailed_display_df = pd.DataFrame()
     st.session_state.loading = False
+    st.session_state.ranking = None
+    st.session_state.base_ranking = None
+    st.session_state.search_session = None
+    st.session_state.rerank_pending = False
+    st.session_state.results_page = 1
+    st.session_state.score_breakdown_df = pd.DataFrame()
+    for key in [key for key in st.session_state if key.startswith("weight_")]:
+        del st.session_state[key] # Weight sliders start from 1.0 for every new search
+
+# --- Helper function to load one page of the ranking into the results table ---
+def load_results_page():
+    cursor = (st.session_state.results_page - 1) * RESULTS_PAGE_SIZE
+    page_leads, _ = st.session_state.ranking.page(cursor, RESULTS_PAGE_SIZE)
+    st.session_state.all_filtered_and_ranked_df = pd.DataFrame(page_leads)
+    if st.session_state.ranking.components is not None:
+        breakdown_df = pd.DataFrame(st.session_state.ranking.breakdown(cursor, RESULTS_PAGE_SIZE))
+        breakdown_df.insert(0, "Company", [lead.get("Company") for lead in page_leads])
+        st.session_state.score_breakdown_df = breakdown_df
+    st.session_state.detailed_display_df = pd.DataFrame()
+    if 'ranked_leads_editor' in st.session_state:
+        del st.session_state['ranked_leads_editor']
+
+# --- Helper function to re-rank with the weight sliders (no rule is re-evaluated) ---
+def current_score_weights():
+    components = st.session_state.base_ranking.components
+    return {name: st.session_state[f"weight_{name}"] for name in components.names if f"weight_{name}" in st.session_state}
+
+def apply_score_weights():
+    if st.session_state.search_session is not None:
+        # A search keeps only its top leads; new weights can promote others, so re-weight the whole slice
+        full_ranking = st.session_state.search_session.full_ranking()
+        if full_ranking is None: # new day or new lead data since the search: run a fresh search instead
+            clear_results()
+            return
+        st.session_state.base_ranking = full_ranking
+    st.session_state.ranking = st.session_state.base_ranking.reweighted(current_score_weights())
+    st.session_state.results_page = 1
+    load_results_page()
+
+# --- Helper function for criteria changes: re-rank the current search instead of clearing it ---
+def schedule_rerank():
+    # The new value only lands in user_inputs when the inputs are rendered, so re-rank after that
+    if st.session_state.search_session is None:
+        clear_results()
+    else:
+        st.session_state.rerank_pending = True
 
 # --- Streamlit App Layout ---
 st.set_page_config(layout="wide", page_title="Intelligent Lead Ranking System")
@@ -42,7 +109,7 @@ st.header("1. Define Your Search Criteria & Goal")
 
 col1, col2 = st.columns(2)
 with col1:
-    unique_sectors = ["Healthcare", "Construction", "Retail", "Software", "Renewable Energy", "Finance", "Education", "Food & Beverage", "Technology", "Logistics", "Consulting", "Real Estate", "Agriculture", "Pharmaceutical"]
+    unique_sectors = SECTORS
     selected_sector = st.selectbox(
         "Select Target Sector(s) (e.g., Healthcare, Technology, All)",
         options=["All"] + unique_sectors,
@@ -55,7 +122,7 @@ with col1:
         st.session_state.sector = selected_sector
 
 with col2:
-    unique_regions = ["California", "Texas", "Washington", "Oregon", "New York", "Massachusetts", "Florida", "Illinois", "New Jersey"]
+    unique_regions = REGIONS
     selected_region = st.selectbox(
         "Select Target Region(s) (e.g., California, Texas, All)",
         options=["All"] + unique_regions,
@@ -69,7 +136,7 @@ with col2:
 
 selected_purpose = st.selectbox(
     "What is your primary goal for these leads?",
-    options=["Select Purpose", "Job Search", "Investor Research", "Sales Prospecting", "Merger and Acquisition/Partnership", "Market Research / Competitive Analysis"],
+    options=["Select Purpose"] + PURPOSES,
     key="purpose_input",
     on_change=clear_results
 )
@@ -87,10 +154,10 @@ if st.session_state.purpose != "Select Purpose":
         current_company_size_preference = st.session_state.user_inputs.get("company_size_preference", "")
         st.session_state.user_inputs["company_size_preference"] = st.selectbox(
             "Preferred Company Size:",
-            options=["", "Small (1-50 employees)", "Medium (51-500 employees)", "Large (500+ employees)"],
-            index=["", "Small (1-50 employees)", "Medium (51-500 employees)", "Large (500+ employees)"].index(current_company_size_preference),
+            options=COMPANY_SIZE_OPTIONS,
+            index=COMPANY_SIZE_OPTIONS.index(current_company_size_preference),
             key="job_size_pref",
-            on_change=clear_results
+            on_change=schedule_rerank
         )
         # current_desired_role_focus = st.session_state.user_inputs.get("desired_role_focus", "")
         # st.session_state.user_inputs["desired_role_focus"] = st.selectbox(
@@ -105,18 +172,18 @@ if st.session_state.purpose != "Select Purpose":
         current_investment_stage = st.session_state.user_inputs.get("investment_stage", "")
         st.session_state.user_inputs["investment_stage"] = st.selectbox(
             "Preferred Investment Stage:",
-            options=["", "Seed/Angel", "Series A/B", "Growth Equity", "Mature/Public Ready"],
-            index=["", "Seed/Angel", "Series A/B", "Growth Equity", "Mature/Public Ready"].index(current_investment_stage),
+            options=INVESTMENT_STAGE_OPTIONS,
+            index=INVESTMENT_STAGE_OPTIONS.index(current_investment_stage),
             key="inv_stage_pref",
-            on_change=clear_results
+            on_change=schedule_rerank
         )
         current_revenue_threshold_valuation = st.session_state.user_inputs.get("revenue_threshold_valuation", "")
         st.session_state.user_inputs["revenue_threshold_valuation"] = st.selectbox(
             "Revenue Threshold / Valuation:",
-            options=["", "Under $1M", "$1M - $5M", "$5M - $10M", "$10M - $50M", "$50M - $100M", "Over $100M"],
-            index=["", "Under $1M", "$1M - $5M", "$5M - $10M", "$10M - $50M", "$50M - $100M", "Over $100M"].index(current_revenue_threshold_valuation),
+            options=REVENUE_RANGE_OPTIONS,
+            index=REVENUE_RANGE_OPTIONS.index(current_revenue_threshold_valuation),
             key="inv_rev_val",
-            on_change=clear_results
+            on_change=schedule_rerank
         )
         # current_tech_focus = st.session_state.user_inputs.get("tech_focus", "")
         # st.session_state.user_inputs["tech_focus"] = st.selectbox(
@@ -131,18 +198,18 @@ if st.session_state.purpose != "Select Purpose":
         current_buyer_type = st.session_state.user_inputs.get("buyer_type", "")
         st.session_state.user_inputs["buyer_type"] = st.selectbox(
             "Target Buyer Type:",
-            options=["", "B2B", "B2C", "B2B2C"],
-            index=["", "B2B", "B2C", "B2B2C"].index(current_buyer_type),
+            options=BUYER_TYPE_OPTIONS,
+            index=BUYER_TYPE_OPTIONS.index(current_buyer_type),
             key="sales_buyer_type",
-            on_change=clear_results
+            on_change=schedule_rerank
         )
         current_product_category = st.session_state.user_inputs.get("your_product_category", "")
         st.session_state.user_inputs["your_product_category"] = st.selectbox(
             "Your Product/Service Category (select the best fit):",
-            options=["", "CRM Software", "Cloud Security", "HR Software", "Marketing Automation", "Data Analytics Platform", "Financial Advisory", "Supply Chain Management", "Project Management Tools", "E-commerce Solutions", "AI/ML Solutions"],
-            index=["", "CRM Software", "Cloud Security", "HR Software", "Marketing Automation", "Data Analytics Platform", "Financial Advisory", "Supply Chain Management", "Project Management Tools", "E-commerce Solutions", "AI/ML Solutions"].index(current_product_category),
+            options=PRODUCT_CATEGORY_OPTIONS,
+            index=PRODUCT_CATEGORY_OPTIONS.index(current_product_category),
             key="sales_prod_cat",
-            on_change=clear_results
+            on_change=schedule_rerank
         )
         # current_pain_points_addressed = st.session_state.user_inputs.get("pain_points_addressed", "")
         # st.session_state.user_inputs["pain_points_addressed"] = st.selectbox(
@@ -157,55 +224,70 @@ if st.session_state.purpose != "Select Purpose":
         current_target_size_preference = st.session_state.user_inputs.get("target_size_preference", "")
         st.session_state.user_inputs["target_size_preference"] = st.selectbox(
             "Preferred Target Company Size:",
-            options=["", "Small (1-50 employees)", "Medium (51-500 employees)", "Large (500+ employees)"],
-            index=["", "Small (1-50 employees)", "Medium (51-500 employees)", "Large (500+ employees)"].index(current_target_size_preference),
+            options=COMPANY_SIZE_OPTIONS,
+            index=COMPANY_SIZE_OPTIONS.index(current_target_size_preference),
             key="ma_target_size",
-            on_change=clear_results
+            on_change=schedule_rerank
         )
         current_type_of_alliance = st.session_state.user_inputs.get("type_of_alliance", "")
         st.session_state.user_inputs["type_of_alliance"] = st.selectbox(
             "Type of Alliance Sought:",
-            options=["", "Acquisition Target", "Strategic Partner", "Joint Venture"],
-            index=["", "Acquisition Target", "Strategic Partner", "Joint Venture"].index(current_type_of_alliance),
+            options=ALLIANCE_TYPE_OPTIONS,
+            index=ALLIANCE_TYPE_OPTIONS.index(current_type_of_alliance),
             key="ma_alliance_type",
-            on_change=clear_results
+            on_change=schedule_rerank
         )
         current_synergy_areas = st.session_state.user_inputs.get("synergy_areas", "")
         st.session_state.user_inputs["synergy_areas"] = st.selectbox(
             "Key Synergy Areas:",
-            options=["", "Market Expansion", "Technology Integration", "Talent Acquisition", "Cost Reduction", "Product Diversification", "Customer Base Access"],
-            index=["", "Market Expansion", "Technology Integration", "Talent Acquisition", "Cost Reduction", "Product Diversification", "Customer Base Access"].index(current_synergy_areas),
+            options=SYNERGY_AREA_OPTIONS,
+            index=SYNERGY_AREA_OPTIONS.index(current_synergy_areas),
             key="ma_synergy",
-            on_change=clear_results
+            on_change=schedule_rerank
         )
 
     elif st.session_state.purpose == "Market Research / Competitive Analysis":
         current_niche = st.session_state.user_inputs.get("your_niche", "")
         st.session_state.user_inputs["your_niche"] = st.selectbox(
             "Your Niche/Product Category (select the best fit):",
-            options=["", "Healthcare AI Software", "Sustainable Construction Materials", "Luxury Fashion E-commerce", "Cybersecurity Solutions", "Supply Chain Management Software", "Cloud Infrastructure", "Drug Discovery", "Urban Planning", "Data Strategy Consulting", "Organic Farming", "K-12 Learning Software", "Pharmaceutical Manufacturing", "Industrial Automation", "Wealth Management"],
-            index=["", "Healthcare AI Software", "Sustainable Construction Materials", "Luxury Fashion E-commerce", "Cybersecurity Solutions", "Supply Chain Management Software", "Cloud Infrastructure", "Drug Discovery", "Urban Planning", "Data Strategy Consulting", "Organic Farming", "K-12 Learning Software", "Pharmaceutical Manufacturing", "Industrial Automation", "Wealth Management"].index(current_niche),
+            options=NICHE_OPTIONS,
+            index=NICHE_OPTIONS.index(current_niche),
             key="mr_niche",
-            on_change=clear_results
+            on_change=schedule_rerank
         )
         current_revenue_range = st.session_state.user_inputs.get("your_revenue_range", "")
         st.session_state.user_inputs["your_revenue_range"] = st.selectbox(
             "Your Company's Approximate Annual Revenue Range (for comparison):",
-            options=["", "Under $1M", "$1M - $5M", "$5M - $10M", "$10M - $50M", "$50M - $100M", "Over $100M"],
-            index=["", "Under $1M", "$1M - $5M", "$5M - $10M", "$10M - $50M", "$50M - $100M", "Over $100M"].index(current_revenue_range),
+            options=REVENUE_RANGE_OPTIONS,
+            index=REVENUE_RANGE_OPTIONS.index(current_revenue_range),
             key="mr_your_revenue_range",
-            on_change=clear_results
+            on_change=schedule_rerank
         )
         current_competitor_focus = st.session_state.user_inputs.get("competitor_focus", "Direct Competitors")
         st.session_state.user_inputs["competitor_focus"] = st.radio(
             "Focus on:",
-            options=["Direct Competitors", "Adjacent Market Players", "Emerging Disruptors"],
-            index=["Direct Competitors", "Adjacent Market Players", "Emerging Disruptors"].index(current_competitor_focus),
+            options=COMPETITOR_FOCUS_OPTIONS,
+            index=COMPETITOR_FOCUS_OPTIONS.index(current_competitor_focus),
             key="mr_focus",
-            on_change=clear_results
+            on_change=schedule_rerank
         )
 
 
+# --- Incremental Re-ranking after a criteria change ---
+if st.session_state.rerank_pending:
+    st.session_state.rerank_pending = False
+    # Only the scoring rules that read the changed input are re-evaluated on the current search
+    reranked = st.session_state.search_session.rerank(st.session_state.purpose, st.session_state.user_inputs)
+    if reranked is None: # new day or new lead data since the search: run a fresh search instead
+        clear_results()
+    else:
+        st.session_state.base_ranking = reranked
+        st.session_state.ranking = reranked.reweighted(current_score_weights())
+        st.session_state.results_page = 1
+        load_results_page()
+        evaluated = st.session_state.search_session.evaluated
+        st.caption(f"Re-ranked for your new criteria ({len(evaluated)} scoring rule(s) re-evaluated).")
+
 st.markdown("---")
 st.header("3. Find & Rank Leads")
 
@@ -218,33 +300,66 @@ if st.button("🔎 Find & Rank Leads", key="find_rank_button", disabled=button_d
 
     with st.spinner("Fetching, enriching, and ranking leads... This might take a moment based on the number of leads."):
         st.write("Step 1: Filtering raw leads by **Sector** and **Region**...")
-        filtered_raw_leads = fetch_raw_leads(st.session_state.sector, st.session_state.region)
-        
-        if not filtered_raw_leads:
+        st.write("Step 2: Enriching the filtered leads...")
+        st.write("Step 3: Ranking leads based on your **purpose** and **custom criteria**...")
+        # Searches precomputed by `python -m utils.ranking_cube build` (for today's corpus) are a single lookup
+        cube_hit = lookup_ranking(
+            st.session_state.sector,
+            st.session_state.region,
+            st.session_state.purpose,
+            st.session_state.user_inputs
+        )
+        if cube_hit is not None:
+            raw_lead_count, total_ranked, ranking = cube_hit
+        else:
+            progress_bar = st.progress(0.0)
+
+            def show_progress(progress):
+                # Raw leads are streamed through all three steps in chunks
+                progress_bar.progress(
+                    progress.raw_scanned / progress.raw_total if progress.raw_total else 1.0,
+                    text=f"Scanned {progress.raw_scanned} of {progress.raw_total} raw leads: "
+                         f"{progress.raw_matched} matched, {progress.leads_scored} enriched leads ranked"
+                )
+
+            # Identical searches (from any session, on the same day and corpus) are served from the ranking cache;
+            # only the best SEARCH_TOP_K leads are kept for the result pages
+            raw_lead_count, ranking = find_and_rank_leads(
+                st.session_state.sector,
+                st.session_state.region,
+                st.session_state.purpose,
+                st.session_state.user_inputs,
+                on_progress=show_progress,
+                top_k=SEARCH_TOP_K
+            )
+            progress_bar.empty()
+
+        if not raw_lead_count:
             st.warning("No raw leads found matching your sector and region criteria. Please adjust your search.")
             st.session_state.loading = False
             st.stop()
 
-        company_names_to_enrich = [lead["company_name"] for lead in filtered_raw_leads]
-
-        st.write(f"Step 2: Enriching {len(company_names_to_enrich)} filtered leads...")
-        enriched_leads_data = fetch_enriched_leads(company_names_to_enrich)
-        
-        if not enriched_leads_data:
+        if not len(ranking):
             st.warning("No enriched data found for the filtered raw leads. Check your `enriched_leads.json` file or selected criteria.")
             st.session_state.loading = False
             st.stop()
 
-        st.write("Step 3: Ranking leads based on your **purpose** and **custom criteria**...")
-        final_ranked_leads = rank_enriched_leads(
-            enriched_leads_data,
-            st.session_state.purpose,
-            st.session_state.user_inputs,
-            st.session_state.sector,
-            st.session_state.region
-        )
-        
-        st.session_state.all_filtered_and_ranked_df = pd.DataFrame(final_ranked_leads)
+        # Only the page being displayed is sorted and materialized into the session DataFrame
+        st.session_state.ranking = ranking
+        st.session_state.base_ranking = ranking
+        load_results_page()
+        if cube_hit is not None:
+            # Cube rankings keep no score components: weight tuning and incremental re-ranking need a live search
+            st.caption(f"Top {len(ranking)} of {total_ranked} enriched leads ({raw_lead_count} filtered leads), "
+                       f"served from the precomputed ranking cube.")
+        else:
+            st.session_state.search_session = SearchSession(
+                st.session_state.sector, st.session_state.region, st.session_state.purpose,
+                st.session_state.user_inputs, raw_lead_count, ranking
+            )
+            cache_stats = get_ranking_cache("rules").stats()
+            st.caption(f"Top {len(ranking)} ranked enriched leads out of {raw_lead_count} filtered leads "
+                       f"(ranking cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses).")
         
         st.success("Leads fetched, enriched, and ranked successfully!")
         st.session_state.show_selection_message = True
@@ -256,6 +371,28 @@ if not st.session_state.all_filtered_and_ranked_df.empty:
     st.header("4. Top Ranked Leads for Your Selection")
     st.markdown("Select companies from the ranked list below for a detailed view. Higher **Rank Score** indicates a better fit.")
 
+    total_ranked = len(st.session_state.ranking)
+    total_pages = -(-total_ranked // RESULTS_PAGE_SIZE)
+    if total_pages > 1:
+        st.number_input(
+            f"Page (of {total_pages}, {total_ranked} ranked leads)",
+            min_value=1,
+            max_value=total_pages,
+            key="results_page",
+            on_change=load_results_page
+        )
+
+    base_ranking = st.session_state.base_ranking
+    if base_ranking is not None and base_ranking.components is not None:
+        with st.expander("⚖️ Tune Score Weights"):
+            st.caption("Scale how much each scoring rule counts. Leads are re-ranked instantly from the stored rule points.")
+            weight_columns = st.columns(3)
+            for i, name in enumerate(base_ranking.components.names):
+                weight_columns[i % 3].slider(
+                    name.replace("_", " ").title(), min_value=0.0, max_value=3.0, value=1.0, step=0.1,
+                    key=f"weight_{name}", on_change=apply_score_weights
+                )
+
     display_df = st.session_state.all_filtered_and_ranked_df.copy()
     
     if 'Website' not in display_df.columns:
@@ -299,7 +436,7 @@ if not st.session_state.all_filtered_and_ranked_df.empty:
                 help="Overall match score based on your criteria",
                 format="%f",
                 min_value=0,
-                max_value=max(display_df['Rank Score'].max(), 100)
+                max_value=max(st.session_state.ranking.max_score, 100)
             )
         },
         num_rows="dynamic",
@@ -328,6 +465,12 @@ if not st.session_state.all_filtered_and_ranked_df.empty:
 
             st.dataframe(st.session_state.detailed_display_df, use_container_width=True)
 
+            if not st.session_state.score_breakdown_df.empty:
+                st.markdown("**Rank Score breakdown** (points per scoring rule)")
+                breakdown_df = st.session_state.score_breakdown_df
+                st.dataframe(breakdown_df[breakdown_df['Company'].isin(st.session_state.selected_company_names)],
+                             hide_index=True, use_container_width=True)
+
             csv_data_selected = st.session_state.detailed_display_df.to_csv(index=False)
             st.download_button(
                 label="Download Selected Leads Details as CSV",
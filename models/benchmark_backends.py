@@ -0,0 +1,88 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import joblib
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # make `utils` importable
+from train_model import (
+    CATEGORICAL_ENCODERS, DATA_DIR, ENRICHED_LEADS_FILE, MODEL_BACKENDS, build_training_set, load_data, train_model,
+)
+
+
+# --- Model Backend Benchmark ---
+# Trains every backend of train_model.py on the same leads and split, then reports what
+# serving pays for each: fit time, predict latency per batch size, artifact size and R^2.
+# Batches larger than the corpus are drawn with replacement from its feature rows.
+# A variant is a backend name, optionally with a categorical encoder: "random_forest:hashing".
+
+DEFAULT_BATCH_SIZES = [1, 1_000, 100_000]
+DEFAULT_VARIANTS = list(MODEL_BACKENDS) + ["random_forest:hashing"]
+LATENCY_REPEATS = 5 # best of; small batches are too noisy to time once
+
+
+def _best_time(function, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def _artifact_size(model):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "model.pkl")
+        joblib.dump(model, path)
+        return os.path.getsize(path)
+
+def parse_variant(variant):
+    backend, _, encoder = variant.partition(":")
+    if backend not in MODEL_BACKENDS or (encoder and encoder not in CATEGORICAL_ENCODERS):
+        raise argparse.ArgumentTypeError(f"unknown variant {variant!r}")
+    return variant
+
+def benchmark_backend(variant, features, true_rank, batch_sizes=DEFAULT_BATCH_SIZES):
+    """{"fit_s", "r2", "size_mb", "predict_ms": {batch size: ms}} of one backend[:encoder] variant."""
+    backend, _, encoder = variant.partition(":")
+    started = time.perf_counter()
+    model, r2 = train_model(features, true_rank, backend, encoder or None)
+    fit_seconds = time.perf_counter() - started # includes the (shared) split and test scoring
+
+    rng = np.random.default_rng(42)
+    predict_ms = {}
+    for size in batch_sizes:
+        batch = features.iloc[rng.integers(0, len(features), size)]
+        model.predict(batch) # warm-up
+        repeats = LATENCY_REPEATS if size < 10_000 else 1
+        predict_ms[size] = _best_time(lambda: model.predict(batch), repeats) * 1000
+    return {"fit_s": fit_seconds, "r2": r2, "size_mb": _artifact_size(model) / 1e6, "predict_ms": predict_ms}
+
+def print_report(results, batch_sizes):
+    columns = ["variant", "fit s", *[f"predict {size:,} ms" for size in batch_sizes], "artifact MB", "R^2"]
+    rows = [[variant, f"{result['fit_s']:.2f}", *[f"{result['predict_ms'][size]:.1f}" for size in batch_sizes],
+             f"{result['size_mb']:.2f}", f"{result['r2']:.4f}"] for variant, result in results.items()]
+    widths = [max(len(column), *(len(row[i]) for row in rows)) for i, column in enumerate(columns)]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the ML ranking model backends on the same data.")
+    parser.add_argument("--data", default=os.path.join(DATA_DIR, ENRICHED_LEADS_FILE))
+    parser.add_argument("--backends", nargs="+", type=parse_variant, default=DEFAULT_VARIANTS,
+                        help="backend or backend:encoder variants, e.g. random_forest:hashing")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=DEFAULT_BATCH_SIZES)
+    args = parser.parse_args()
+
+    df = load_data(args.data)
+    if df.empty:
+        print("No enriched leads data loaded. Exiting benchmark.")
+        sys.exit(1)
+    features, true_rank, _ = build_training_set(df)
+    results = {variant: benchmark_backend(variant, features, true_rank, args.batch_sizes) for variant in args.backends}
+    print()
+    print(f"{len(df)} leads")
+    print_report(results, args.batch_sizes)
@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # make `utils` importable
+# utils modules are imported inside the functions, so a measured process starts with none of them
+
+
+# --- Model Cold-Start Benchmark ---
+# What a fresh server process pays before it can serve its first ML ranking, per way of
+# loading the model. Every run is a new Python process (nothing imported or cached in it);
+# the OS page cache is left warm, as for a worker started next to others.
+#   pickle      joblib.load of the pickle (the ML page before the flat export)
+#   pickle-mmap joblib.load(mmap_mode="r") of the pickle
+#   flat        the flat export read fully into memory
+#   flat-mmap   the flat export memory-mapped (what the ML page does)
+# "anon MB" is the process memory the load adds that is not shared file-backed page cache
+# (Linux only; "nan" elsewhere).
+
+LOAD_MODES = ["pickle", "pickle-mmap", "flat", "flat-mmap"]
+DEFAULT_REPEATS = 5
+
+
+def _anonymous_mb():
+    """Anonymous memory of this process in MB; NaN where /proc is unavailable (macOS, Windows)."""
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Anonymous:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+def measure_in_this_process(mode, model_path):
+    """Loads the model once as `mode` and predicts one lead; returns the timings (run in a fresh process)."""
+    started = time.perf_counter()
+    import pandas as pd
+    from utils.features import build_features
+    imported = time.perf_counter()
+    anonymous_before = _anonymous_mb()
+    if mode.startswith("flat"):
+        from utils.flat_forest import flat_model_path_for, load_flat_model
+        model = load_flat_model(flat_model_path_for(model_path), mmap_mode="r" if mode == "flat-mmap" else None)
+        artifact = {"pipeline": model, "feature_stats": model.feature_stats}
+    else:
+        from utils.ml_scores import load_model_artifact
+        artifact = load_model_artifact(model_path, mmap_mode="r" if mode == "pickle-mmap" else None)
+    loaded = time.perf_counter()
+    artifact["pipeline"].predict(build_features(pd.DataFrame([{}]), artifact["feature_stats"]))
+    predicted = time.perf_counter()
+    return {
+        "import_ms": (imported - started) * 1000, "load_ms": (loaded - imported) * 1000,
+        "first_predict_ms": (predicted - loaded) * 1000, "anon_mb": _anonymous_mb() - anonymous_before,
+    }
+
+def measure_cold_start(mode, model_path, repeats=DEFAULT_REPEATS):
+    """Median timings of `repeats` fresh processes, with their whole wall time as "process_ms"."""
+    runs = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--model", model_path, "--child", mode],
+                                check=True, capture_output=True, text=True).stdout
+        run = json.loads(output.strip().splitlines()[-1])
+        run["process_ms"] = (time.perf_counter() - started) * 1000
+        runs.append(run)
+    return {name: statistics.median(run[name] for run in runs) for name in runs[0]}
+
+def _size_mb(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 1e6
+    return os.path.getsize(path) / 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure how long a fresh process takes to load the ML model and serve.")
+    parser.add_argument("--model", default=os.path.join("models", "ranking_model.pkl"))
+    parser.add_argument("--modes", nargs="+", choices=LOAD_MODES, default=LOAD_MODES)
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--child", choices=LOAD_MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_in_this_process(args.child, args.model)))
+        sys.exit()
+
+    from utils.flat_forest import flat_model_path_for
+    modes = [mode for mode in args.modes if not mode.startswith("flat") or os.path.exists(flat_model_path_for(args.model))]
+    print(f"{args.model}: {_size_mb(args.model):.2f} MB pickle", end="")
+    if os.path.exists(flat_model_path_for(args.model)):
+        print(f", {_size_mb(flat_model_path_for(args.model)):.2f} MB flat export", end="")
+    print(f"; median of {args.repeats} fresh processes")
+    columns = ["mode", "process ms", "import ms", "load ms", "first predict ms", "anon MB"]
+    rows = []
+    for mode in modes:
+        result = measure_cold_start(mode, args.model, args.repeats)
+        rows.append([mode, *(f"{result[name]:.1f}" for name in ["process_ms", "import_ms", "load_ms", "first_predict_ms", "anon_mb"])])
+    widths = [max(len(column), *(len(row[i]) for row in rows)) for i, column in enumerate(columns)]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)))
@@ -1,127 +1,423 @@
 import pandas as pd
+import argparse
 import json
 import os
-import joblib
+import sys
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.linear_model import SGDRegressor
+from sklearn.preprocessing import FunctionTransformer, StandardScaler, OneHotEncoder, OrdinalEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # make `utils` importable
+from utils.snapshot import load_enriched_frame
+from utils.fetch_data import corpus_version, corpus_version_on_disk
+from utils.features import (
+    CATEGORICAL_FEATURES, HASHED_CATEGORY_FEATURES, NUMERICAL_FEATURES, FeatureStatsAccumulator, build_features,
+    category_tokens, corpus_features, fit_feature_stats,
+)
+from utils.lead_stream import DEFAULT_CHUNK_SIZE, iter_lead_chunks
+from utils.model_registry import purpose_path
+from utils.numeric import parse_numeric_series
+from utils.search_options import PURPOSES
+from utils.flat_forest import export_pipeline, flat_model_path_for, save_flat_model
+from utils.ml_scores import (
+    ML_SCORES_FILE, load_model_artifact, model_version, predict_rank_scores, save_ml_scores, save_model_artifact,
+)
 
 
 # --- Configuration ---
 DATA_DIR = 'data'
 MODELS_DIR = 'models'
 ENRICHED_LEADS_FILE = 'enriched_leads.json'
-
-# Ensure models directory exists
-os.makedirs(MODELS_DIR, exist_ok=True)
+RANKING_MODEL_FILE = 'ranking_model.pkl'
 
 # --- 1. Load Data ---
 def load_data(file_path):
+    # Reads the compiled columnar snapshot instead of the JSON when one is present
     try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
+        return load_enriched_frame(file_path)
     except FileNotFoundError:
         print(f"Error: {file_path} not found. Please ensure the data files are in the '{DATA_DIR}' directory.")
-        return []
+        return pd.DataFrame()
     except json.JSONDecodeError:
         print(f"Error: Could not decode JSON from {file_path}. Check file format.")
-        return []
+        return pd.DataFrame()
 
-print(f"Loading data from {os.path.join(DATA_DIR, ENRICHED_LEADS_FILE)}...")
-enriched_leads = load_data(os.path.join(DATA_DIR, ENRICHED_LEADS_FILE))
-if not enriched_leads:
-    print("No enriched leads data loaded. Exiting training script.")
-    exit()
+# --- 2. Feature Engineering and Target Creation ---
+def build_training_set(df):
+    """Returns (model features, synthetic 'true_rank' target, fitted feature statistics).
 
-df = pd.DataFrame(enriched_leads)
-print(f"Loaded {len(df)} enriched leads.")
+    The features come from utils/features.py, the same builder serving uses; the statistics
+    it fits here (e.g. the means that fill missing numbers) are saved with the model.
+    """
+    feature_stats = fit_feature_stats(df)
+    features = build_features(df, feature_stats)
 
-# --- 2. Feature Engineering and Target Creation ---
-# Define a synthetic 'true_rank' based on features that indicate a "good" lead.
-# This is crucial as we don't have explicit rank labels in your data.
-# You would replace this with your actual target variable if you had labeled data.
-
-# Convert relevant columns to numeric, coercing errors will turn non-numeric to NaN
-df['Employees Count'] = pd.to_numeric(df['Employees Count'], errors='coerce')
-# Remove '$' and ',' from Revenue and convert to numeric (millions)
-df['Revenue_Numeric'] = df['Revenue'].replace({r'\$': '', r',': ''}, regex=True).astype(float) / 1_000_000
-df['Hiring Activity'] = pd.to_numeric(df['Hiring Activity'], errors='coerce')
-df['Recent Employee Growth %'] = pd.to_numeric(df['Recent Employee Growth %'], errors='coerce')
-
-# Create a binary feature for funding presence
-df['Is_Funded'] = df['Recent Funding / Investment'].apply(
-    lambda x: 1 if pd.notna(x) and x not in ["None reported", "N/A", "", "none reported", "n/a"] else 0
-)
+    true_rank = synthetic_rank(features)
+    print(f"Generated synthetic 'true_rank' for {len(df)} leads.")
+    print(f"True rank distribution (min, max, mean): {true_rank.min()}, {true_rank.max()}, {true_rank.mean():.2f}")
+    return features, true_rank, feature_stats
 
-# Fill NaNs for numerical features that will contribute to the rank
-# Using mean for simplicity, consider more sophisticated imputation if needed.
-df['Employees Count'].fillna(df['Employees Count'].mean(), inplace=True)
-df['Revenue_Numeric'].fillna(df['Revenue_Numeric'].mean(), inplace=True)
-df['Hiring Activity'].fillna(0, inplace=True) # Assume 0 if unknown
-df['Recent Employee Growth %'].fillna(0, inplace=True) # Assume 0 if unknown
-
-# Synthetic target variable (example formula - adjust weights as desired)
-# The idea is to create a score from 0-100 that a "good" lead would have.
-df['true_rank'] = (
-    (df['Hiring Activity'] * 5) +                       # High hiring is good
-    (df['Recent Employee Growth %'] * 3) +             # Good growth is good
-    (df['Revenue_Numeric'] * 0.5) +                    # Higher revenue is good (scaled)
-    (df['Is_Funded'] * 20)                             # Being funded is a strong positive
-)
+def synthetic_rank(features):
+    """The training target for a feature frame: a 0-100 score of how "good" each lead looks."""
+    # Define a synthetic 'true_rank' based on features that indicate a "good" lead.
+    # This is crucial as we don't have explicit rank labels in your data.
+    # You would replace this with your actual target variable if you had labeled data.
+    # Synthetic target variable (example formula - adjust weights as desired)
+    # The idea is to create a score from 0-100 that a "good" lead would have.
+    true_rank = (
+        (features['Hiring Activity'] * 5) +                       # High hiring is good
+        (features['Recent Employee Growth %'] * 3) +             # Good growth is good
+        (features['Revenue_Numeric'] * 0.5) +                    # Higher revenue is good (scaled)
+        (features['Is_Funded'] * 20)                             # Being funded is a strong positive
+    )
 
-# Clip the synthetic rank to be between 0 and 100 for consistency
-df['true_rank'] = df['true_rank'].clip(0, 100).astype(int)
-print(f"Generated synthetic 'true_rank' for {len(df)} leads.")
-print(f"True rank distribution (min, max, mean): {df['true_rank'].min()}, {df['true_rank'].max()}, {df['true_rank'].mean():.2f}")
-
-
-# --- 3. Feature Selection and Preprocessing Pipeline ---
-numerical_features = [
-    'Employees Count',
-    'Revenue_Numeric',
-    'Hiring Activity',
-    'Recent Employee Growth %',
-    'Is_Funded'
-]
-categorical_features = [
-    'Industry',
-    'Product/Service Category',
-    'Business Type (B2B, B2B2C)'
-]
-
-# Create preprocessor for numerical and categorical features
-preprocessor = ColumnTransformer(
-    transformers=[
-        ('num', StandardScaler(), numerical_features),
-        ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features)
-    ],
-    remainder='drop' # Drop columns not specified
-)
+    # Clip the synthetic rank to be between 0 and 100 for consistency
+    return true_rank.clip(0, 100).astype(int)
+
+# Targets of the per-purpose models (train --per-purpose): what makes a lead "good" depends on
+# the purpose of the search. Synthetic weights per feature, combined like synthetic_rank's.
+PURPOSE_TARGET_WEIGHTS = {
+    "Job Search": {'Hiring Activity': 6, 'Recent Employee Growth %': 3, 'Is_Funded': 10},
+    "Investor Research": {'Recent Employee Growth %': 4, 'Revenue_Numeric': 0.5, 'Is_Funded': 25},
+    "Sales Prospecting": {'Revenue_Numeric': 0.8, 'Employees Count': 0.05, 'Hiring Activity': 2},
+    "Merger and Acquisition/Partnership": {'Revenue_Numeric': 1.0, 'Employees Count': 0.03, 'Is_Funded': 10},
+    "Market Research / Competitive Analysis": {'Recent Employee Growth %': 3, 'Hiring Activity': 3, 'Revenue_Numeric': 0.3},
+}
+# Real 0-100 labels for a purpose, where leads carry them, replace its synthetic target
+PURPOSE_LABEL_FIELD = "Rank Label ({purpose})"
+
+def purpose_rank(df, features, purpose):
+    """The training target of `purpose`'s model for leads `df` (with their features)."""
+    weights = PURPOSE_TARGET_WEIGHTS[purpose]
+    true_rank = sum(features[name] * weight for name, weight in weights.items()).clip(0, 100)
+    label_field = PURPOSE_LABEL_FIELD.format(purpose=purpose)
+    if label_field in df.columns:
+        true_rank = parse_numeric_series(df[label_field]).clip(0, 100).fillna(true_rank)
+    return true_rank.astype(int)
+
+# --- 3. Model Backends (Preprocessing Pipeline + Regressor) ---
+# Categorical codes must fit HistGradientBoosting's bins; rarer categories are grouped together
+HGB_MAX_CATEGORIES = 255
+
+def make_hashing_encoder():
+    # "column=value" strings hashed into a fixed number of sparse columns: memory and predict cost
+    # stay bounded however many distinct categories appear (colliding categories share a column)
+    return Pipeline(steps=[('tokens', FunctionTransformer(category_tokens)),
+                           ('hasher', FeatureHasher(n_features=HASHED_CATEGORY_FEATURES, input_type='string',
+                                                    alternate_sign=False))])
+
+CATEGORICAL_ENCODERS = {
+    "onehot": lambda: OneHotEncoder(handle_unknown='ignore'),
+    "hashing": make_hashing_encoder,
+}
+
+def make_random_forest_pipeline(encoder=None):
+    # Create preprocessor for numerical and categorical features
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('num', StandardScaler(), NUMERICAL_FEATURES),
+            ('cat', CATEGORICAL_ENCODERS[encoder or "onehot"](), CATEGORICAL_FEATURES)
+        ],
+        remainder='drop' # Drop columns not specified
+    )
+    return Pipeline(steps=[('preprocessor', preprocessor),
+                           ('regressor', RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1))])
+
+def make_hist_gradient_boosting_pipeline(encoder=None):
+    if encoder is not None:
+        raise ValueError("hist_gradient_boosting encodes categories natively; it takes no categorical encoder")
+    # Trees split on numbers directly and on categories natively, so no scaling or one-hot columns:
+    # categories become ordinal codes (unknown and missing values become NaN, which HGB handles)
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('num', 'passthrough', NUMERICAL_FEATURES),
+            ('cat', OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=np.nan,
+                                   encoded_missing_value=np.nan, max_categories=HGB_MAX_CATEGORIES), CATEGORICAL_FEATURES)
+        ],
+        remainder='drop'
+    )
+    categorical_mask = [False] * len(NUMERICAL_FEATURES) + [True] * len(CATEGORICAL_FEATURES)
+    return Pipeline(steps=[('preprocessor', preprocessor),
+                           ('regressor', HistGradientBoostingRegressor(categorical_features=categorical_mask, random_state=42))])
+
+MODEL_BACKENDS = {
+    "random_forest": make_random_forest_pipeline,
+    "hist_gradient_boosting": make_hist_gradient_boosting_pipeline,
+}
+DEFAULT_BACKEND = "random_forest"
+
+# --- 4. Model Training ---
+def train_model(X, y, backend=DEFAULT_BACKEND, encoder=None):
+    """Fits the preprocessing + regressor pipeline of `backend`; returns (model, R-squared on the test split).
+
+    `encoder` picks the categorical encoding (CATEGORICAL_ENCODERS) of backends that take one; None is one-hot.
+    """
+    # Split data into training and testing sets
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    print(f"Data split: {len(X_train)} training, {len(X_test)} testing.")
+
+    model = MODEL_BACKENDS[backend](encoder)
+    print(f"Training {type(model.steps[-1][1]).__name__} model...")
+    model.fit(X_train, y_train)
+
+    # Evaluate the model
+    score = model.score(X_test, y_test)
+    print(f"Model training complete. R-squared on test set: {score:.2f}")
+    return model, score
+
+# --- 5. Streaming (Out-of-Core) Training ---
+# For corpora that do not fit in memory. The lead JSON is read in chunks (utils/lead_stream.py)
+# over several passes: one for the feature statistics and category sets, one for the scaler,
+# then epochs of SGDRegressor.partial_fit. The result is the same kind of Pipeline as the
+# in-memory backends, so saving, scoring and serving do not change, and `update` can keep
+# training it on newly ingested leads.
+STREAMING_EPOCHS = 5
+HOLDOUT_FRACTION = 0.2 # like train_test_split's test_size
+
+def _holdout_mask(n_rows, chunk_index):
+    # Seeded per chunk, so every pass over the file holds out the same leads
+    return np.random.default_rng([42, chunk_index]).random(n_rows) < HOLDOUT_FRACTION
+
+def fit_streaming_pipeline(data_path, chunk_size=DEFAULT_CHUNK_SIZE, encoder=None):
+    """Fits the preprocessing chunk by chunk; returns (Pipeline with an unfitted SGDRegressor, feature statistics)."""
+    stats = FeatureStatsAccumulator()
+    categories = {name: set() for name in CATEGORICAL_FEATURES}
+    for chunk in iter_lead_chunks(data_path, chunk_size):
+        stats.partial_fit(chunk)
+        for name in CATEGORICAL_FEATURES:
+            if name in chunk.columns and encoder != "hashing": # hashing needs no vocabulary
+                categories[name].update(chunk[name].dropna().unique())
+    feature_stats = stats.stats()
+
+    scaler = StandardScaler()
+    sample = None
+    for chunk in iter_lead_chunks(data_path, chunk_size):
+        features = build_features(chunk, feature_stats)
+        scaler.partial_fit(features[NUMERICAL_FEATURES])
+        sample = features if sample is None else sample
+
+    # Categories seen anywhere in the corpus are fixed up front (the hashing encoder is
+    # stateless), so fitting on one chunk sets the encoder up exactly; the scaler fitted on the
+    # whole corpus then replaces the sample's.
+    if encoder == "hashing":
+        category_encoder = make_hashing_encoder()
+    else:
+        category_encoder = OneHotEncoder(categories=[sorted(categories[name], key=str) for name in CATEGORICAL_FEATURES],
+                                         handle_unknown='ignore')
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('num', StandardScaler(), NUMERICAL_FEATURES),
+            ('cat', category_encoder, CATEGORICAL_FEATURES)
+        ],
+        remainder='drop'
+    )
+    preprocessor.fit(sample)
+    preprocessor.transformers_[0] = ('num', scaler, NUMERICAL_FEATURES)
+    return Pipeline(steps=[('preprocessor', preprocessor), ('regressor', SGDRegressor(random_state=42))]), feature_stats
+
+def partial_fit_leads(pipeline, feature_stats, data_path, chunk_size=DEFAULT_CHUNK_SIZE, holdout=False, seed=0):
+    """One pass of regressor.partial_fit over a lead file, each chunk shuffled; skips held-out leads if `holdout`."""
+    preprocessor, regressor = pipeline.steps[0][1], pipeline.steps[-1][1]
+    rng = np.random.default_rng(seed)
+    for chunk_index, chunk in enumerate(iter_lead_chunks(data_path, chunk_size)):
+        features = build_features(chunk, feature_stats)
+        if holdout:
+            features = features[~_holdout_mask(len(features), chunk_index)]
+        if features.empty:
+            continue
+        order = rng.permutation(len(features))
+        regressor.partial_fit(preprocessor.transform(features.iloc[order]), synthetic_rank(features).to_numpy()[order])
+
+def streaming_score(pipeline, feature_stats, data_path, chunk_size=DEFAULT_CHUNK_SIZE, holdout=False):
+    """R-squared of the pipeline on a lead file (only its held-out leads if `holdout`), read chunk by chunk."""
+    n, total, total_squares, squared_error = 0, 0.0, 0.0, 0.0
+    for chunk_index, chunk in enumerate(iter_lead_chunks(data_path, chunk_size)):
+        features = build_features(chunk, feature_stats)
+        if holdout:
+            features = features[_holdout_mask(len(features), chunk_index)]
+        if features.empty:
+            continue
+        y = synthetic_rank(features).to_numpy(dtype=float)
+        n, total, total_squares = n + len(y), total + y.sum(), total_squares + (y ** 2).sum()
+        squared_error += ((y - pipeline.predict(features)) ** 2).sum()
+    variance = total_squares - total ** 2 / n if n else 0.0
+    return 1 - squared_error / variance if variance else float("nan")
+
+def train_streaming_model(data_path, chunk_size=DEFAULT_CHUNK_SIZE, epochs=STREAMING_EPOCHS, encoder=None):
+    """Trains on a lead file that need not fit in memory; returns (model, feature statistics, held-out R-squared)."""
+    print(f"Fitting feature statistics, categories and scaler in chunks of {chunk_size} leads...")
+    model, feature_stats = fit_streaming_pipeline(data_path, chunk_size, encoder)
+    for epoch in range(epochs):
+        partial_fit_leads(model, feature_stats, data_path, chunk_size, holdout=True, seed=epoch)
+        print(f"Epoch {epoch + 1}/{epochs} done.")
+    score = streaming_score(model, feature_stats, data_path, chunk_size, holdout=True)
+    print(f"Model training complete. R-squared on held-out leads: {score:.2f}")
+    return model, feature_stats, score
+
+def update_model(model_path, leads_path, chunk_size=DEFAULT_CHUNK_SIZE, epochs=1):
+    """Folds new leads into a streaming-trained model without retraining it from scratch.
+
+    The preprocessing stays as fitted (with one-hot encoding, categories first seen in the new
+    leads are ignored until the next full training); only the regressor continues learning.
+    """
+    artifact = load_model_artifact(model_path)
+    pipeline, feature_stats = artifact["pipeline"], artifact["feature_stats"]
+    if not hasattr(pipeline.steps[-1][1], "partial_fit"):
+        raise ValueError(f"{model_path} cannot be updated incrementally; train it with `train --streaming` first.")
+    print(f"R-squared on the new leads before the update: {streaming_score(pipeline, feature_stats, leads_path, chunk_size):.2f}")
+    for epoch in range(epochs):
+        partial_fit_leads(pipeline, feature_stats, leads_path, chunk_size, seed=epoch)
+    print(f"R-squared on the new leads after the update: {streaming_score(pipeline, feature_stats, leads_path, chunk_size):.2f}")
+    save_model_artifact(pipeline, feature_stats, model_path)
+    print(f"Updated model saved to {model_path}")
+
+# --- 6. Export for Serving ---
+def export_flat_model(model_path):
+    """Compiles the saved pipeline into flat NumPy arrays (utils/flat_forest.py) for sklearn-free serving."""
+    artifact = load_model_artifact(model_path)
+    pipeline = artifact["pipeline"]
+    if not isinstance(pipeline.steps[-1][1], RandomForestRegressor) or \
+            not isinstance(pipeline.steps[0][1].named_transformers_["cat"], OneHotEncoder):
+        print(f"Skipped the flat export: only one-hot RandomForest models can be exported; {model_path} is served as is.")
+        return
+    flat_model = export_pipeline(artifact["pipeline"], model_version(model_path), artifact["feature_stats"])
+    flat_path = flat_model_path_for(model_path)
+    save_flat_model(flat_model, flat_path)
+    print(f"Exported {model_path} to {flat_path}")
+
+# --- 7. Batch Scoring ---
+def score_corpus(model_path, output_path=ML_SCORES_FILE):
+    """Predicts the Rank Score of every lead in the corpus and stores the column for the ML page."""
+    artifact = load_model_artifact(model_path)
+    scores = predict_rank_scores(artifact["pipeline"], corpus_features(artifact["feature_stats"]))
+    save_ml_scores(scores, model_version(model_path), corpus_version(), output_path)
+    print(f"Scored {len(scores)} leads with {model_path}; Rank Scores saved to {output_path}")
+
+def score_corpus_streaming(model_path, data_path, chunk_size=DEFAULT_CHUNK_SIZE, output_path=ML_SCORES_FILE):
+    """score_corpus reading the lead file a chunk at a time (file order is corpus order), for --streaming."""
+    artifact = load_model_artifact(model_path)
+    version = corpus_version_on_disk()
+    scores = [predict_rank_scores(artifact["pipeline"], build_features(chunk, artifact["feature_stats"]))
+              for chunk in iter_lead_chunks(data_path, chunk_size)]
+    if corpus_version_on_disk() != version:
+        print("The lead files changed while scoring; Rank Scores not saved. Rerun `score --streaming`.")
+        return
+    scores = np.concatenate(scores) if scores else np.empty(0, dtype=int)
+    save_ml_scores(scores, model_version(model_path), version, output_path)
+    print(f"Scored {len(scores)} leads with {model_path}; Rank Scores saved to {output_path}")
+
+# --- 8. Per-purpose Models ---
+def train_purpose_models(df, features, feature_stats, model_path, backend=DEFAULT_BACKEND, encoder=None, score=True):
+    """Trains, saves, exports and scores one model per search purpose (see utils/model_registry.py)."""
+    for purpose in PURPOSES:
+        print(f"Training the '{purpose}' model...")
+        model, _ = train_model(features, purpose_rank(df, features, purpose), backend, encoder)
+        path = purpose_path(model_path, purpose)
+        save_model_artifact(model, feature_stats, path)
+        print(f"Trained model saved to {path}")
+        export_flat_model(path)
+        if score:
+            score_corpus(path, purpose_path(ML_SCORES_FILE, purpose))
+
+def trained_purposes(model_path):
+    return [purpose for purpose in PURPOSES if os.path.exists(purpose_path(model_path, purpose))]
 
-# Prepare data for model training
-X = df[numerical_features + categorical_features]
-y = df['true_rank']
 
-# Split data into training and testing sets
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-print(f"Data split: {len(X_train)} training, {len(X_test)} testing.")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the ML ranking model and precompute its Rank Scores.")
+    subcommands = parser.add_subparsers(dest="command")
+    train_parser = subcommands.add_parser("train", help="Train, save and export the model, then score the corpus (the default).")
+    train_parser.add_argument("--backend", choices=sorted(MODEL_BACKENDS), default=DEFAULT_BACKEND)
+    train_parser.add_argument("--encoder", choices=sorted(CATEGORICAL_ENCODERS), default=None,
+                              help="Categorical encoding (default: one-hot; hashing keeps a fixed width)")
+    train_parser.add_argument("--per-purpose", action="store_true",
+                              help="Also train one model per search purpose, each on its own target")
+    train_parser.add_argument("--streaming", action="store_true",
+                              help="Read the leads in chunks and train an SGD model (for corpora larger than memory)")
+    train_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Leads per chunk with --streaming")
+    train_parser.add_argument("--epochs", type=int, default=STREAMING_EPOCHS, help="Passes over the leads with --streaming")
+    train_parser.add_argument("--no-score", action="store_true", help="Skip scoring the corpus after training")
+    update_parser = subcommands.add_parser("update", help="Fold new leads into a streaming-trained model, then score the corpus.")
+    update_parser.add_argument("leads", help="JSON file of the newly ingested enriched leads")
+    update_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    update_parser.add_argument("--epochs", type=int, default=1, help="Passes over the new leads")
+    update_parser.add_argument("--no-score", action="store_true", help="Skip scoring the corpus after the update")
+    subcommands.add_parser("export", help="Export the saved model to flat arrays for serving.")
+    score_parser = subcommands.add_parser("score", help="Score the corpus with the saved model.")
+    score_parser.add_argument("--streaming", action="store_true", help="Read the leads in chunks instead of loading them")
+    score_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+    command = args.command or "train"
 
-# --- 4. Model Training (Scikit-learn RandomForestRegressor) ---
-print("Training RandomForestRegressor model...")
-model = Pipeline(steps=[('preprocessor', preprocessor),
-                        ('regressor', RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1))])
+    data_path = os.path.join(DATA_DIR, ENRICHED_LEADS_FILE)
+    model_path = os.path.join(MODELS_DIR, RANKING_MODEL_FILE)
+    # Ensure models directory exists
+    os.makedirs(MODELS_DIR, exist_ok=True)
 
-model.fit(X_train, y_train)
+    if command == "train":
+        if getattr(args, "streaming", False):
+            if args.per_purpose:
+                print("Error: --per-purpose trains in memory; it cannot be combined with --streaming.")
+                sys.exit(1)
+            if not os.path.exists(data_path):
+                print(f"Error: {data_path} not found. Please ensure the data files are in the '{DATA_DIR}' directory.")
+                sys.exit()
+            print(f"Streaming data from {data_path}...")
+            model, feature_stats, _ = train_streaming_model(data_path, args.chunk_size, args.epochs, args.encoder)
+        else:
+            print(f"Loading data from {data_path}...")
+            df = load_data(data_path)
+            if df.empty:
+                print("No enriched leads data loaded. Exiting training script.")
+                sys.exit()
+            print(f"Loaded {len(df)} enriched leads.")
 
-# Evaluate the model
-score = model.score(X_test, y_test)
-print(f"Model training complete. R-squared on test set: {score:.2f}")
+            features, true_rank, feature_stats = build_training_set(df)
+            try:
+                model, _ = train_model(features, true_rank, getattr(args, "backend", DEFAULT_BACKEND), getattr(args, "encoder", None))
+            except ValueError as e:
+                print(f"Error: {e}")
+                sys.exit(1)
 
-# --- 5. Save the Model and Preprocessors ---
-# The entire pipeline (preprocessor + regressor) can be saved
-joblib.dump(model, os.path.join(MODELS_DIR, 'ranking_model.pkl'))
-print(f"Trained model saved to {os.path.join(MODELS_DIR, 'ranking_model.pkl')}")
+        # --- 9. Save the Model and Preprocessors ---
+        # The entire pipeline (preprocessor + regressor) is saved with the fitted feature statistics
+        save_model_artifact(model, feature_stats, model_path)
+        print(f"Trained model saved to {model_path}")
+        export_flat_model(model_path)
+        if not getattr(args, "no_score", False):
+            if getattr(args, "streaming", False): # scoring must not load the whole corpus either
+                score_corpus_streaming(model_path, data_path, args.chunk_size)
+            else:
+                score_corpus(model_path)
+        if getattr(args, "per_purpose", False):
+            train_purpose_models(df, features, feature_stats, model_path, args.backend, args.encoder, not args.no_score)
+    else:
+        if not os.path.exists(model_path):
+            print(f"Error: {model_path} not found. Train the model first.")
+            sys.exit(1)
+        if command == "update":
+            try:
+                update_model(model_path, args.leads, args.chunk_size, args.epochs)
+            except ValueError as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+            if not args.no_score:
+                score_corpus_streaming(model_path, data_path, args.chunk_size)
+        elif command == "export":
+            export_flat_model(model_path)
+            for purpose in trained_purposes(model_path):
+                export_flat_model(purpose_path(model_path, purpose))
+        elif args.streaming:
+            score_corpus_streaming(model_path, data_path, args.chunk_size)
+            for purpose in trained_purposes(model_path):
+                score_corpus_streaming(purpose_path(model_path, purpose), data_path, args.chunk_size,
+                                       purpose_path(ML_SCORES_FILE, purpose))
+        else:
+            score_corpus(model_path)
+            for purpose in trained_purposes(model_path):
+                score_corpus(purpose_path(model_path, purpose), purpose_path(ML_SCORES_FILE, purpose))
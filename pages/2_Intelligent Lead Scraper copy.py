@@ -2,9 +2,11 @@ import streamlit as st
 import pandas as pd
 import json
 import os
-import joblib # For loading the trained model and preprocessors
-import re # For cleaning revenue strings
-import numpy as np # For numerical operations and NaN handling
+from utils.fetch_data import corpus_version, get_enriched_frame
+from utils.features import corpus_features
+from utils.ml_scores import ML_SCORES_FILE, get_ml_scores, model_version, predict_rank_scores
+from utils.model_registry import get_model_registry, resolve_purpose_paths
+from utils.ranking_cache import get_ranking_cache, make_query_key
 # from utils.fetch_data import fetch_raw_leads, fetch_enriched_leads, rank_enriched_leads # Assuming these functions are now integrated or defined here
 
 
@@ -35,27 +37,27 @@ def load_json_data(file_path):
         return []
 
 RAW_LEADS_DATA = load_json_data(RAW_LEADS_FILE)
-ENRICHED_LEADS_DATA = load_json_data(ENRICHED_LEADS_FILE)
-
+# Enriched leads come from the process-wide store (reloaded when the file changes), so row
+# positions always line up with the precomputed scores and features of the same corpus version
 
 # --- ML Model and Preprocessor Loading ---
-@st.cache_resource # Use st.cache_resource to load the ML assets only once
-def load_ml_assets():
-    model_path = os.path.join(os.getcwd(), MODELS_DIR, RANKING_MODEL_FILE)
-    
+def ml_model_paths(purpose):
+    """(model file, precomputed scores file) serving `purpose`: its own model if trained, else the general one."""
+    return resolve_purpose_paths(os.path.join(os.getcwd(), MODELS_DIR, RANKING_MODEL_FILE), ML_SCORES_FILE, purpose)
+
+def load_ml_assets(purpose):
+    # Models load on first use of their purpose; the process-wide registry keeps the most recently used ones
+    model_path, _ = ml_model_paths(purpose)
     try:
-        model = joblib.load(model_path)
-        st.success("ML ranking model loaded successfully!")
-        return model
+        # {"pipeline", "feature_stats"}: the model (flat-array export when current) plus the feature statistics fitted in training
+        return get_model_registry().get(model_path)
     except FileNotFoundError:
-        st.error(f"ML model '{RANKING_MODEL_FILE}' not found at '{model_path}'. Please run 'train_model.py' first.")
+        st.error(f"ML model '{os.path.basename(model_path)}' not found at '{model_path}'. Please run 'train_model.py' first.")
         return None
     except Exception as e:
         st.error(f"Error loading ML assets: {e}")
         return None
 
-ml_ranking_pipeline = load_ml_assets()
-
 # --- Functions for Lead Processing (Integrated from fetch_data.py concept) ---
 
 def fetch_raw_leads_integrated(sector=None, region=None):
@@ -68,80 +70,43 @@ def fetch_raw_leads_integrated(sector=None, region=None):
     return df_raw.to_dict('records')
 
 def fetch_enriched_leads_integrated(company_names):
-    """Fetches enriched data for a list of company names."""
-    df_enriched = pd.DataFrame(ENRICHED_LEADS_DATA)
+    """Fetches enriched data for a list of company names, as a DataFrame indexed by corpus position."""
+    try:
+        df_enriched = get_enriched_frame()
+    except FileNotFoundError:
+        st.error(f"Error: Data file '{ENRICHED_LEADS_FILE}' not found. Please ensure the data files are in the '{DATA_DIR}' directory.")
+        return pd.DataFrame()
     # Ensure 'company_name' is the key for merging/filtering
-    df_filtered = df_enriched[df_enriched['company_name'].isin(company_names)]
-    return df_filtered.to_dict('records')
-
-
-def preprocess_for_prediction(df_to_predict):
-    """
-    Preprocesses the DataFrame for ML prediction.
-    MUST match the preprocessing steps in train_model.py exactly.
-    """
-    df_processed = df_to_predict.copy()
-
-    # Convert numerical features
-    df_processed['Employees Count'] = pd.to_numeric(df_processed['Employees Count'], errors='coerce')
-    # Remove '$' and ',' from Revenue and convert to numeric
-    df_processed['Revenue_Numeric'] = df_processed['Revenue'].replace({r'\$': '', r',': ''}, regex=True).astype(float) / 1_000_000
-    df_processed['Hiring Activity'] = pd.to_numeric(df_processed['Hiring Activity'], errors='coerce')
-    df_processed['Recent Employee Growth %'] = pd.to_numeric(df_processed['Recent Employee Growth %'], errors='coerce')
-
-    # Create binary feature for funding presence
-    df_processed['Is_Funded'] = df_processed['Recent Funding / Investment'].apply(
-        lambda x: 1 if pd.notna(x) and str(x).lower() not in ["none reported", "n/a", ""] else 0
-    )
-
-    # Fill NaNs for numerical features - consistent with training (using mean here)
-    for col in ['Employees Count', 'Revenue_Numeric', 'Hiring Activity', 'Recent Employee Growth %']:
-        if col in df_processed.columns:
-            df_processed[col].fillna(0, inplace=True) # Fallback to 0 if no training mean available
-    
-    # Select features that the model was trained on
-    numerical_features_used = [
-        'Employees Count',
-        'Revenue_Numeric',
-        'Hiring Activity',
-        'Recent Employee Growth %',
-        'Is_Funded'
-    ]
-    categorical_features_used = [
-        'Industry',
-        'Product/Service Category',
-        'Business Type (B2B, B2B2C)'
-    ]
-
-    # Return only the columns needed by the model
-    return df_processed[numerical_features_used + categorical_features_used]
+    return df_enriched[df_enriched['company_name'].isin(company_names)].copy()
 
 
-def rank_enriched_leads_ml_integrated(filtered_leads_df):
+def rank_enriched_leads_ml_integrated(filtered_leads_df, purpose):
     """
-    Ranks enriched leads using the loaded ML model.
+    Ranks enriched leads using the ML model of the search purpose.
     """
     if filtered_leads_df.empty:
         return pd.DataFrame()
 
-    if ml_ranking_pipeline is None: # Changed 'is' to '===' for robustness
+    # Scores precomputed for the whole corpus (python models/train_model.py score) are just looked up,
+    # without loading the model at all
+    corpus_scores = get_ml_scores(ml_model_version(purpose), corpus_version(), ml_model_paths(purpose)[1])
+    if corpus_scores is not None:
+        filtered_leads_df['Rank Score'] = corpus_scores[filtered_leads_df.index.to_numpy()].astype(int)
+        return filtered_leads_df.sort_values(by='Rank Score', ascending=False)
+
+    ml_model_artifact = load_ml_assets(purpose)
+    if ml_model_artifact is None: # Changed 'is' to '===' for robustness
         st.warning("ML ranking model not loaded. Please ensure the model is trained and saved. Falling back to a basic ranking logic.")
         # Fallback to a simple ranking logic if the ML model is not available
         filtered_leads_df['Rank Score'] = 0
         return filtered_leads_df.sort_values(by='Rank Score', ascending=False)
 
     try:
-        # Preprocess data for prediction using the loaded pipeline's preprocessor
-        features_for_prediction = preprocess_for_prediction(filtered_leads_df)
-        
-        # Make predictions
-        predicted_ranks = ml_ranking_pipeline.predict(features_for_prediction)
-        
-        # Add predicted ranks to the DataFrame
-        filtered_leads_df['Rank Score'] = predicted_ranks
-
-        # Ensure rank scores are integers and within 0-100
-        filtered_leads_df['Rank Score'] = filtered_leads_df['Rank Score'].clip(0, 100).astype(int)
+        # Features come from the shared builder (utils/features.py), cached for the whole corpus
+        feature_stats = ml_model_artifact["feature_stats"]
+        features = corpus_features(feature_stats).iloc[filtered_leads_df.index.to_numpy()]
+        # Integer rank scores within 0-100, same as the batch scoring job
+        filtered_leads_df['Rank Score'] = predict_rank_scores(ml_model_artifact["pipeline"], features)
 
         return filtered_leads_df.sort_values(by='Rank Score', ascending=False)
 
@@ -152,6 +117,31 @@ def rank_enriched_leads_ml_integrated(filtered_leads_df):
         return filtered_leads_df.sort_values(by='Rank Score', ascending=False)
 
 
+def ml_model_version(purpose):
+    """Identifies the purpose's model file on disk, so cached rankings are dropped when it is retrained."""
+    return model_version(ml_model_paths(purpose)[0])
+
+def find_and_rank_leads_ml(sector, region, purpose, user_inputs):
+    """fetch -> enrich -> ML rank for one search, memoized in the process-wide "ml" ranking cache.
+
+    Returns (number of raw leads matched, ranked DataFrame or None when nothing was enriched).
+    """
+    key = make_query_key(f"{corpus_version()}:{ml_model_version(purpose)}", sector, region, purpose, user_inputs, None)
+
+    def run_pipeline():
+        filtered_raw_leads = fetch_raw_leads_integrated(sector, region)
+        if not filtered_raw_leads:
+            return 0, None
+        enriched_leads_df = fetch_enriched_leads_integrated([lead["company_name"] for lead in filtered_raw_leads])
+        if enriched_leads_df.empty:
+            return len(filtered_raw_leads), None
+        return len(filtered_raw_leads), rank_enriched_leads_ml_integrated(enriched_leads_df, purpose)
+
+    raw_lead_count, ranked_df = get_ranking_cache("ml").get_or_compute(key, run_pipeline)
+    # Sessions modify their results table, so each one gets its own copy of the cached frame
+    return raw_lead_count, (ranked_df.copy() if ranked_df is not None else None)
+
+
 # --- Initialize Session State Variables ---
 # Ensure all session state variables used are initialized
 if 'sector' not in st.session_state:
@@ -296,29 +286,29 @@ if st.button("🔎 Find & Rank Leads", key="find_rank_button", disabled=button_d
 
     with st.spinner("Fetching, enriching, and ranking leads... This might take a moment based on the number of leads."):
         st.write("Step 1: Filtering raw leads by **Sector** and **Region**...")
-        filtered_raw_leads = fetch_raw_leads_integrated(st.session_state.sector, st.session_state.region)
-        
-        if not filtered_raw_leads:
+        st.write("Step 2: Enriching the filtered leads...")
+        st.write("Step 3: Ranking leads based on your **purpose** and **custom criteria** using ML model...")
+        # Identical searches (from any session, on the same corpus and model) are served from the ranking cache
+        raw_lead_count, final_ranked_leads = find_and_rank_leads_ml(
+            st.session_state.sector,
+            st.session_state.region,
+            st.session_state.purpose,
+            st.session_state.user_inputs
+        )
+
+        if not raw_lead_count:
             st.warning("No raw leads found matching your sector and region criteria. Please adjust your search.")
             st.session_state.loading = False
             st.stop()
 
-        company_names_to_enrich = [lead["company_name"] for lead in filtered_raw_leads]
-
-        st.write(f"Step 2: Ranking {len(company_names_to_enrich)} filtered leads...")
-        enriched_leads_data = fetch_enriched_leads_integrated(company_names_to_enrich)
-        
-        if not enriched_leads_data:
+        if final_ranked_leads is None:
             st.warning("No enriched data found for the filtered raw leads. Check your `enriched_leads.json` file or selected criteria.")
             st.session_state.loading = False
             st.stop()
 
-        st.write("Step 3: Ranking leads based on your **purpose** and **custom criteria** using ML model...")
-        final_ranked_leads = rank_enriched_leads_ml_integrated(
-            pd.DataFrame(enriched_leads_data).copy() # Pass a copy to ML ranking
-        )
-        
         st.session_state.all_filtered_and_ranked_df = pd.DataFrame(final_ranked_leads)
+        cache_stats = get_ranking_cache("ml").stats()
+        st.caption(f"Ranking cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses.")
         
         st.success("Leads fetched, enriched, and ranked successfully!")
         st.session_state.show_selection_message = True
@@ -0,0 +1,51 @@
+import json
+import os
+import pandas as pd
+from utils.columnar import ColumnarLeads
+from utils.ranking_engine import compute_static_features
+from utils.snapshot import compile_snapshot, fresh_snapshot_path, load_enriched_leads, load_snapshot, save_snapshot
+
+RECORDS = [
+    {"Company": "Acme", "Employees Count": "120", "Tags": ["saas", "b2b"], "Address": {"City": "Austin"}},
+    {"Company": "Globex", "Employees Count": 120, "Tags": ["saas", "b2b"]},
+    {"Company": "Initech", "Tags": [], "Address": {"City": "Austin"}},
+    {"Company": "Umbrella", "Employees Count": 120.0, "Tags": ["b2b", "saas"]},
+]
+
+
+def test_list_and_dict_values_are_encoded():
+    leads = ColumnarLeads.from_records(RECORDS)
+    assert list(leads) == RECORDS
+    codes, values = leads.column("Tags")
+    assert values == [["saas", "b2b"], [], ["b2b", "saas"]] # equal lists share a code
+    assert codes.tolist() == [0, 0, 1, 2]
+    assert leads.column("Employees Count")[1] == ["120", 120, 120.0]
+
+def test_to_frame_matches_records_frame():
+    frame = ColumnarLeads.from_records(RECORDS).to_frame()
+    expected = pd.DataFrame(RECORDS)
+    assert list(frame.columns) == list(expected.columns)
+    assert frame["Tags"].tolist() == expected["Tags"].tolist()
+    assert frame["Address"].iloc[1] != frame["Address"].iloc[1] # NaN where the field is absent
+
+def test_snapshot_round_trip_and_ingest(tmp_path):
+    leads = ColumnarLeads.from_records(RECORDS)
+    path = str(tmp_path / "leads.npz")
+    save_snapshot(leads, path)
+    assert list(load_snapshot(path)) == RECORDS
+    features = compute_static_features(leads)
+    assert all(len(column) == len(RECORDS) for column in features.values())
+
+def test_snapshot_is_stale_when_the_json_is_replaced_by_an_older_file(tmp_path):
+    json_path = str(tmp_path / "leads.json")
+    with open(json_path, "w") as f:
+        json.dump(RECORDS, f)
+    snapshot_path, _ = compile_snapshot(json_path)
+    assert fresh_snapshot_path(json_path) == snapshot_path
+    compiled_at = os.stat(json_path).st_mtime_ns
+
+    with open(json_path, "w") as f: # e.g. `cp -p` of an older export
+        json.dump(RECORDS[:2], f)
+    os.utime(json_path, ns=(compiled_at - 10**9, compiled_at - 10**9))
+    assert fresh_snapshot_path(json_path) is None
+    assert list(load_enriched_leads(json_path)) == RECORDS[:2]
@@ -0,0 +1,31 @@
+from utils.columnar import ColumnarLeads
+from utils.keyword_matcher import KeywordMatcher
+from utils.ranking_engine import compute_static_features, score_leads
+
+MATCHER = KeywordMatcher({"innovation": ["ai", "robotics"], "ai": ["ai"]})
+
+# Lists and dicts in every field the keyword matchers read
+ODD_RECORDS = [
+    {"Company": "Acme", "Product/Service Category": ["AI", "Robotics"], "Industry": {"name": "Software"},
+     "Recent Funding / Investment": ["Series A"], "Owner's Title": {"title": "CEO"}},
+    {"Company": "Globex", "Product/Service Category": "AI robotics", "Industry": "Software",
+     "Recent Funding / Investment": "Series A ($5M)", "Owner's Title": "CEO"},
+]
+
+
+def test_match_finds_overlapping_classes():
+    assert MATCHER.match("Applied AI") == {"innovation", "ai"}
+    assert MATCHER.match("ROBOTICS") == {"innovation"}
+    assert MATCHER.match("") == frozenset()
+
+def test_match_treats_non_strings_as_no_match():
+    for value in [None, 3, ["ai"], {"ai": "robotics"}]:
+        assert MATCHER.match(value) == frozenset()
+
+def test_list_and_dict_values_do_not_match_keywords():
+    features = compute_static_features(ColumnarLeads.from_records(ODD_RECORDS))
+    for name in ["category:innovation", "industry:tech", "funding:early_stage", "title:leadership"]:
+        assert features[name].tolist() == [False, True]
+    assert features["funding_points"].tolist() == [0, 20]
+    scores = score_leads(ODD_RECORDS, "Investor Research", {}, "Technology", "")
+    assert scores[0] < scores[1]
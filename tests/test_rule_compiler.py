@@ -0,0 +1,30 @@
+import json
+import pytest
+from utils.rule_compiler import ScoringRules, load_scoring_rules
+
+def _spec(common, purpose_rules):
+    return {
+        "templates": {"bonus": {"name": "bonus", "points": 5}},
+        "common": common,
+        "purposes": {"Job Search": purpose_rules},
+    }
+
+
+def test_shipped_rules_load():
+    rules = load_scoring_rules()
+    assert rules.rules("Job Search")
+
+def test_duplicate_rule_name_across_common_and_purpose_raises():
+    spec = _spec([{"name": "completeness", "points": 1}], [{"name": "completeness", "points": 2}])
+    with pytest.raises(ValueError, match="Job Search.*completeness"):
+        ScoringRules(spec)
+
+def test_duplicate_rule_name_from_templates_raises():
+    with pytest.raises(ValueError, match="bonus"):
+        ScoringRules(_spec([], [{"use": "bonus"}, {"use": "bonus"}]))
+
+def test_duplicate_common_rule_name_raises_when_loading(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(_spec([{"name": "recency", "points": 1}, {"name": "recency", "points": 2}], [])))
+    with pytest.raises(ValueError, match="common rules: recency"):
+        load_scoring_rules(str(path))
@@ -0,0 +1,245 @@
+import copy
+import datetime
+import json
+import os
+import pytest
+from utils.numeric import parse_numeric
+from utils.ranking_engine import score_leads
+
+# The vectorized engine and the rule file must give exactly the scores of the original per-lead
+# loop (rank_enriched_leads before the rule table), transcribed below with the shared numeric
+# parser in place of its own and the current day passed in.
+
+AS_OF = datetime.date(2025, 6, 1)
+ENRICHED_LEADS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "enriched_leads.json")
+
+def _num(lead, key):
+    return parse_numeric(lead.get(key, 0))
+
+def _score_company_size(employees_count, preference):
+    if not preference: return 0
+    if "Small" in preference and 1 <= employees_count <= 50: return 20
+    elif "Medium" in preference and 51 <= employees_count <= 500: return 20
+    elif "Large" in preference and employees_count > 500: return 20
+    elif "Specific Range" in preference: return 10
+    return 0
+
+def _score_revenue_threshold(revenue, threshold_str):
+    revenue_map = {
+        "Under $1M": (0, 1000000), "$1M - $5M": (1000000, 5000000), "$5M - $10M": (5000000, 10000000),
+        "$10M - $50M": (10000000, 50000000), "$50M - $100M": (50000000, 100000000),
+        "Over $100M": (100000000, float('inf')),
+    }
+    if threshold_str in revenue_map:
+        min_val, max_val = revenue_map[threshold_str]
+        return 25 if min_val <= revenue < max_val else 0
+    return 0
+
+def _score_investment_stage(year_founded, employees_count, revenue, funding_lower, stage_preference):
+    if not stage_preference: return 0
+    company_stage = "Unknown"
+    if year_founded >= 2020 and employees_count < 50 and revenue < 1000000 and "seed" in funding_lower:
+        company_stage = "Seed/Angel"
+    elif 2015 <= year_founded < 2020 and 50 <= employees_count < 200 and 1000000 <= revenue < 10000000 and ("series a" in funding_lower or "series b" in funding_lower):
+        company_stage = "Series A/B"
+    elif employees_count >= 200 and revenue >= 10000000 and ("series c" in funding_lower or "growth equity" in funding_lower):
+        company_stage = "Growth Equity"
+    elif employees_count >= 500 and revenue >= 50000000 and "public" in funding_lower:
+        company_stage = "Mature/Public Ready"
+    return 25 if company_stage == stage_preference else 0
+
+def _score_growth_rate(growth_percentage):
+    if growth_percentage > 20: return 25
+    if growth_percentage > 10: return 15
+    if growth_percentage > 0: return 5
+    if growth_percentage < 0: return -10
+    return 0
+
+def _score_hiring_activity(hiring_activity_score):
+    if hiring_activity_score >= 8: return 30
+    if hiring_activity_score >= 6: return 20
+    if hiring_activity_score >= 4: return 10
+    if hiring_activity_score > 0: return 5
+    return 0
+
+def _score_recent_funding(funding_desc):
+    funding_desc = funding_desc.lower()
+    if "series d" in funding_desc or "($100m)" in funding_desc: return 40
+    if "series c" in funding_desc or "($50m)" in funding_desc: return 35
+    if "series b" in funding_desc or "($20m)" in funding_desc or "($30m)" in funding_desc: return 30
+    if "seed" in funding_desc or "series a" in funding_desc or "($5m)" in funding_desc or "($2m)" in funding_desc: return 20
+    if "secured" in funding_desc or "raised capital" in funding_desc or "grant" in funding_desc: return 10
+    if "publicly traded" in funding_desc: return 5
+    return 0
+
+def legacy_score(lead, purpose, user_inputs, sector, region, today):
+    score = 0
+    essential_fields = [
+        "Company", "Website", "Industry", "Employees Count", "Revenue",
+        "Year Founded", "City", "State", "Company Phone", "Owner's Email"
+    ]
+    filled_essential_fields = sum(1 for field in essential_fields if lead.get(field) not in [None, "", "0", 0])
+    score += (filled_essential_fields / len(essential_fields)) * 10
+
+    try:
+        updated_date_str = lead.get("Updated")
+        if updated_date_str:
+            days_since_update = (today - datetime.datetime.strptime(updated_date_str, "%Y-%m-%d").date()).days
+            if days_since_update < 90: score += 10
+            elif days_since_update < 365: score += 5
+    except (ValueError, TypeError):
+        pass
+
+    company_industry_enriched = lead.get("Industry", "").lower()
+    if sector.lower() in company_industry_enriched: score += 20
+    elif any(s in company_industry_enriched for s in sector.lower().split()): score += 10
+
+    company_city, company_state, region_lower = lead.get("City", "").lower(), lead.get("State", "").lower(), region.lower()
+    if region_lower in company_city or region_lower in company_state: score += 20
+    elif region_lower.split(" ")[0] in company_city or region_lower.split(" ")[0] in company_state: score += 10
+
+    employees_count, revenue, year_founded = _num(lead, "Employees Count"), _num(lead, "Revenue"), _num(lead, "Year Founded")
+    hiring_activity, growth = _num(lead, "Hiring Activity"), _num(lead, "Recent Employee Growth %")
+    funding_status = lead.get("Recent Funding / Investment", "").lower()
+    product_category = lead.get("Product/Service Category", "").lower()
+    has_http_website = lead.get("Website") and "http" in lead["Website"]
+    bbb_rating = lead.get("BBB Rating", "").upper()
+
+    if purpose == "Job Search":
+        score += _score_company_size(employees_count, user_inputs.get("company_size_preference", ""))
+        score += _score_hiring_activity(hiring_activity)
+        score += _score_growth_rate(growth)
+        if lead.get("Owner's LinkedIn"): score += 10
+        if today.year - year_founded <= 10 and year_founded > 0: score += 15
+        elif today.year - year_founded > 20 and year_founded > 0: score += 10
+        score += 5 if has_http_website else -5
+        if lead.get("Company LinkedIn"): score += 5
+        if "A" in bbb_rating: score += 5
+        elif "F" in bbb_rating or "D" in bbb_rating: score -= 10
+
+    elif purpose == "Investor Research":
+        score += _score_revenue_threshold(revenue, user_inputs.get("revenue_threshold_valuation", ""))
+        score += _score_investment_stage(year_founded, employees_count, revenue, funding_status, user_inputs.get("investment_stage", ""))
+        score += _score_recent_funding(funding_status)
+        score += _score_growth_rate(growth)
+        owner_title = lead.get("Owner's Title", "").lower()
+        if lead.get("Owner's LinkedIn") and any(title in owner_title for title in ["ceo", "founder", "cto", "president", "managing director"]):
+            score += 15
+        elif lead.get("Owner's LinkedIn"):
+            score += 5
+        if any(keyword in product_category for keyword in ["ai", "robotics", "genomics", "clean energy", "biotech", "fintech"]):
+            score += 15
+        if revenue > 50000000: score += 10
+        if employees_count > 300: score += 5
+        if has_http_website: score += 5
+
+    elif purpose == "Sales Prospecting":
+        company_business_type = lead.get("Business Type (B2B, B2B2C)", "").lower()
+        user_buyer_type = user_inputs.get("buyer_type", "").lower()
+        if company_business_type == user_buyer_type: score += 30
+        elif user_buyer_type == "b2b" and company_business_type == "b2b2c": score += 15
+        elif user_buyer_type == "b2c" and company_business_type == "b2b2c": score += 10
+        your_product = user_inputs.get("your_product_category", "").lower()
+        industry = lead.get("Industry", "").lower()
+        if "crm software" in your_product and ("sales" in product_category or "marketing" in product_category or "client management" in product_category or "consulting" in industry): score += 35
+        elif "cloud security" in your_product and ("software" in industry or "technology" in industry or "cybersecurity" in product_category or "it services" in industry): score += 35
+        elif "hr software" in your_product and (employees_count > 50 or "human resources" in product_category): score += 35
+        if 50 <= employees_count <= 500 and revenue > 1000000: score += 25
+        if lead.get("Owner's Email") and lead.get("Owner's Phone Number"): score += 20
+        elif lead.get("Owner's LinkedIn"): score += 10
+        elif lead.get("Company Phone") or lead.get("Owner's Email"): score += 5
+        else: score -= 15
+        score += 10 if has_http_website else -10
+        if "A" in bbb_rating: score += 5
+        elif "D" in bbb_rating or "F" in bbb_rating: score -= 10
+        if hiring_activity >= 7: score += 10
+
+    elif purpose == "Merger and Acquisition/Partnership":
+        score += _score_company_size(employees_count, user_inputs.get("target_size_preference", ""))
+        alliance_type = user_inputs.get("type_of_alliance", "").lower()
+        if alliance_type == "acquisition target":
+            if year_founded >= 2018 and employees_count < 100 and ("ai" in product_category or "innovative" in product_category or "robotics" in product_category): score += 30
+            funding_score = _score_recent_funding(lead.get("Recent Funding / Investment", ""))
+            score += funding_score * 0.5 if funding_score > 0 else 10
+        elif alliance_type == "strategic partner":
+            if year_founded <= 2018 and 50 <= employees_count <= 500 and "complementary" in product_category: score += 30
+            if lead.get("Company LinkedIn") and lead.get("Website"): score += 10
+        if sector.lower() == "healthcare" and "ai" in product_category:
+            if "medical device software" in product_category or "telehealth" in product_category: score += 25
+        if revenue > 10000000: score += 10
+        if employees_count > 50: score += 5
+        score += _score_recent_funding(funding_status)
+        if growth > 10: score += 10
+        if lead.get("Owner's LinkedIn") and lead.get("Owner's Title"): score += 10
+
+    elif purpose == "Market Research / Competitive Analysis":
+        your_niche = user_inputs.get("your_niche", "").lower()
+        if your_niche in product_category: score += 35
+        elif any(keyword in product_category for keyword in your_niche.split()): score += 20
+        your_revenue = parse_numeric(user_inputs.get("your_revenue", 0))
+        if your_revenue > 0:
+            if abs(revenue - your_revenue) / your_revenue < 0.2: score += 20
+            elif revenue > your_revenue * 2: score += 15
+            elif revenue < your_revenue * 0.5 and revenue > 0: score += 10
+        elif revenue > 0:
+            score += 5
+        score += _score_hiring_activity(hiring_activity)
+        score += _score_recent_funding(funding_status)
+        score += _score_growth_rate(growth)
+        if today.year - year_founded <= 5 and year_founded > 0: score += 10
+        elif today.year - year_founded > 20 and year_founded > 0: score += 10
+        if lead.get("Website") and lead.get("Company LinkedIn"): score += 10
+
+    return max(0, score)
+
+
+# Variants of the shipped leads that reach the branches the shipped data does not
+VARIANT_FIELDS = [
+    {"Recent Funding / Investment": "Series D ($100M)", "BBB Rating": "F", "Updated": "2025-05-01"},
+    {"Recent Funding / Investment": "Secured a grant", "BBB Rating": "D+", "Updated": "not a date"},
+    {"Recent Funding / Investment": "Publicly traded", "Employees Count": "600", "Revenue": "$60,000,000"},
+    {"Recent Funding / Investment": "Seed round ($2M)", "Year Founded": "2021", "Employees Count": "10", "Revenue": "$250K"},
+    {"Recent Funding / Investment": "Series A ($5M)", "Year Founded": 2017, "Employees Count": 75, "Revenue": "$1.5M"},
+    {"Recent Funding / Investment": "Growth equity", "Employees Count": "250", "Revenue": "$20M"},
+    {"Product/Service Category": "Medical Device Software with AI", "Owner's Title": "Managing Director"},
+    {"Product/Service Category": "Complementary CRM and Sales tools", "Industry": "IT Services", "Year Founded": "2010"},
+    {"Product/Service Category": "Human Resources", "Industry": "Consulting", "Business Type (B2B, B2B2C)": "B2B2C"},
+    {"Website": "www.example.com", "Owner's Email": "", "Owner's Phone Number": "", "Owner's LinkedIn": "", "Company Phone": ""},
+    {"Hiring Activity": "8", "Recent Employee Growth %": "-5", "Employees Count": "nan", "Revenue": "abc"},
+]
+
+PROFILES = [
+    ("Job Search", {}),
+    ("Job Search", {"company_size_preference": "Small (1-50 employees)"}),
+    ("Job Search", {"company_size_preference": "Large (500+ employees)"}),
+    ("Investor Research", {"investment_stage": "Seed/Angel", "revenue_threshold_valuation": "Under $1M"}),
+    ("Investor Research", {"investment_stage": "Growth Equity", "revenue_threshold_valuation": "$10M - $50M"}),
+    ("Investor Research", {"investment_stage": "Unknown", "revenue_threshold_valuation": "Over $100M"}),
+    ("Sales Prospecting", {"buyer_type": "B2B", "your_product_category": "CRM Software"}),
+    ("Sales Prospecting", {"buyer_type": "B2C", "your_product_category": "Cloud Security"}),
+    ("Sales Prospecting", {"buyer_type": "B2B2C", "your_product_category": "HR Software"}),
+    ("Merger and Acquisition/Partnership", {"target_size_preference": "Specific Range", "type_of_alliance": "Acquisition Target"}),
+    ("Merger and Acquisition/Partnership", {"target_size_preference": "Medium (51-500 employees)", "type_of_alliance": "Strategic Partner"}),
+    ("Market Research / Competitive Analysis", {"your_niche": "Healthcare AI Software", "your_revenue": 5000000.0}),
+    ("Market Research / Competitive Analysis", {"your_niche": "", "your_revenue": 0}),
+    ("Select Purpose", {}),
+]
+QUERIES = [("", ""), ("Healthcare", "California"), ("Technology", "New York")]
+
+
+@pytest.fixture(scope="module")
+def leads():
+    with open(ENRICHED_LEADS_PATH, "r") as f:
+        records = json.load(f)
+    variants = []
+    for i, fields in enumerate(VARIANT_FIELDS):
+        lead = copy.deepcopy(records[i % len(records)])
+        lead.update(fields)
+        variants.append(lead)
+    return records + variants
+
+@pytest.mark.parametrize("sector,region", QUERIES)
+@pytest.mark.parametrize("purpose,user_inputs", PROFILES)
+def test_engine_matches_per_lead_loop(leads, purpose, user_inputs, sector, region):
+    expected = [legacy_score(lead, purpose, user_inputs, sector, region, AS_OF) for lead in leads]
+    assert score_leads(leads, purpose, user_inputs, sector, region, as_of=AS_OF).tolist() == expected
@@ -0,0 +1,33 @@
+from utils.fetch_data import (
+    SearchSession, fetch_enriched_table, fetch_raw_leads, find_and_rank_leads, rank_enriched_leads_paged,
+)
+
+# The whole shipped corpus (90 enriched leads) as one slice, searched with a top-K well below it
+SECTOR, REGION = "", ""
+PURPOSE, USER_INPUTS = "Job Search", {"company_size_preference": "Small (1-50 employees)"}
+TOP_K = 20
+WEIGHTS = {"completeness": 0.0, "hiring_activity": 3.0, "growth_rate": 0.0, "company_size": 0.0}
+
+
+def _full_slice_ranking(purpose, user_inputs):
+    leads = fetch_enriched_table([lead["company_name"] for lead in fetch_raw_leads(SECTOR, REGION)])
+    return rank_enriched_leads_paged(leads, purpose, user_inputs, SECTOR, REGION)
+
+def _search_session():
+    raw_count, ranking = find_and_rank_leads(SECTOR, REGION, PURPOSE, USER_INPUTS, top_k=TOP_K)
+    assert len(ranking) == TOP_K
+    return SearchSession(SECTOR, REGION, PURPOSE, USER_INPUTS, raw_count, ranking)
+
+def test_truncated_search_reweights_the_whole_slice():
+    session = _search_session()
+    expected = _full_slice_ranking(PURPOSE, USER_INPUTS).reweighted(WEIGHTS).page(0, 10)[0]
+    assert session.ranking.reweighted(WEIGHTS).page(0, 10)[0] != expected # the top-K alone misses leads
+    assert session.full_ranking().reweighted(WEIGHTS).page(0, 10)[0] == expected
+
+def test_truncated_search_reranks_the_whole_slice():
+    session = _search_session()
+    user_inputs = {"company_size_preference": "Large (500+ employees)"}
+    reranked = session.rerank(PURPOSE, user_inputs)
+    expected = _full_slice_ranking(PURPOSE, user_inputs)
+    assert len(reranked) == len(expected)
+    assert reranked.page(0, len(expected))[0] == expected.page(0, len(expected))[0]
@@ -0,0 +1,148 @@
+import json
+import numpy as np
+import pandas as pd
+from utils.numeric import parse_numeric
+
+# --- Columnar Lead Table ---
+# Every field is dictionary-encoded: an integer code per lead pointing into a table of the
+# field's distinct values, with -1 marking a lead that does not have the field at all.
+# Enriched corpora repeat the same industries, ratings, cities and funding strings heavily,
+# so this is far smaller than a list of dicts and lets scoring work per distinct value.
+
+MISSING = -1
+
+# Fields stored as strings such as "$15,000,000" or "120" that also get a parsed float column
+NUMERIC_FIELDS = ["Employees Count", "Revenue", "Year Founded", "Hiring Activity", "Recent Employee Growth %"]
+
+
+def _codes_dtype(n_values):
+    if n_values < np.iinfo(np.int8).max:
+        return np.int8
+    if n_values < np.iinfo(np.int16).max:
+        return np.int16
+    return np.int32
+
+
+def _value_key(value):
+    """Dictionary key of a field value: "120", 120 and 120.0 stay apart, lists and objects compare by content."""
+    if isinstance(value, (list, dict)):
+        return (type(value), json.dumps(value, sort_keys=True))
+    return (type(value), value)
+
+
+class ColumnarLeads:
+    """Dictionary-encoded, column-oriented view of enriched leads.
+
+    Behaves like a read-only list of lead dicts (len, indexing, iteration), materializing a
+    row only when it is asked for.
+    """
+
+    def __init__(self, fields, codes, values, numeric=None, features=None):
+        self.fields = list(fields)
+        self._codes = codes      # field -> integer code array
+        self._values = values    # field -> list of distinct values
+        self._numeric = numeric if numeric is not None else self._parse_numeric_fields()
+        self._length = len(codes[self.fields[0]]) if self.fields else 0
+        # Optional per-lead arrays computed once at ingest (see ranking_engine.compute_static_features)
+        self.features = features
+
+    @classmethod
+    def from_records(cls, records):
+        fields = []
+        seen = set()
+        for record in records:
+            for field in record:
+                if field not in seen:
+                    seen.add(field)
+                    fields.append(field)
+
+        codes, values = {}, {}
+        for field in fields:
+            table, lookup = [], {}
+            column = []
+            for record in records:
+                if field not in record:
+                    column.append(MISSING)
+                    continue
+                value = record[field]
+                key = _value_key(value)
+                code = lookup.get(key)
+                if code is None:
+                    code = lookup[key] = len(table)
+                    table.append(value)
+                column.append(code)
+            codes[field] = np.asarray(column, dtype=_codes_dtype(len(table)))
+            values[field] = table
+        return cls(fields, codes, values)
+
+    def _parse_numeric_fields(self):
+        numeric = {}
+        for field in NUMERIC_FIELDS:
+            if field in self._codes:
+                table = np.array([parse_numeric(v, np.nan) for v in self._values[field]] + [np.nan])
+                numeric[field] = table[self._codes[field]]
+        return numeric
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, position):
+        record = {}
+        for field in self.fields:
+            code = self._codes[field][position]
+            if code != MISSING:
+                record[field] = self._values[field][code]
+        return record
+
+    def __iter__(self):
+        for position in range(self._length):
+            yield self[position]
+
+    def column(self, field):
+        """Returns (codes, distinct values) for a field; a missing field has all codes at -1."""
+        if field not in self._codes:
+            return np.full(self._length, MISSING, dtype=np.int8), []
+        return self._codes[field], self._values[field]
+
+    def map_values(self, field, func, missing=None):
+        """Applies func once per distinct value of `field` and broadcasts the result to every row.
+
+        Rows without the field get func(missing).
+        """
+        codes, values = self.column(field)
+        results = [func(value) for value in values]
+        results.append(func(missing)) # code -1 selects this slot
+        return np.asarray(results)[codes]
+
+    @property
+    def numeric_fields(self):
+        return list(self._numeric)
+
+    def numeric(self, field):
+        """Returns the parsed float column for one of NUMERIC_FIELDS (NaN where unparseable)."""
+        return self._numeric[field]
+
+    def take(self, positions):
+        """Returns a new table holding only the given rows; the value tables are shared."""
+        positions = np.asarray(positions, dtype=np.intp)
+        codes = {field: column[positions] for field, column in self._codes.items()}
+        numeric = {field: column[positions] for field, column in self._numeric.items()}
+        features = None
+        if self.features is not None:
+            features = {name: column[positions] for name, column in self.features.items()}
+        return ColumnarLeads(self.fields, codes, self._values, numeric, features)
+
+    def with_features(self, features):
+        """Returns the same table with precomputed per-lead feature arrays attached."""
+        return ColumnarLeads(self.fields, self._codes, self._values, self._numeric, features)
+
+    def to_frame(self):
+        """Builds the same DataFrame pd.DataFrame(list_of_lead_dicts) would produce."""
+        data = {}
+        for field in self.fields:
+            table = np.empty(len(self._values[field]) + 1, dtype=object)
+            for code, value in enumerate(self._values[field]): # element-wise: list values must not be broadcast
+                table[code] = value
+            table[-1] = np.nan # code -1 (field absent) indexes the last slot
+            data[field] = table[self._codes[field]]
+        return pd.DataFrame(data, columns=self.fields).infer_objects()
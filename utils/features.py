@@ -0,0 +1,125 @@
+import json
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from utils.fetch_data import corpus_version, get_enriched_frame
+from utils.numeric import parse_numeric_series
+
+# --- ML Feature Pipeline ---
+# The single definition of the ML model's input features, used by train_model.py, the batch
+# scoring job and the ML page alike. Statistics fitted on the training data (the values that
+# fill missing numbers) are saved inside the model artifact, so serving fills exactly like
+# training did. Feature frames of the whole corpus are cached per corpus version, for the
+# few most recently used models only.
+
+NUMERICAL_FEATURES = [
+    'Employees Count',
+    'Revenue_Numeric',
+    'Hiring Activity',
+    'Recent Employee Growth %',
+    'Is_Funded'
+]
+CATEGORICAL_FEATURES = [
+    'Industry',
+    'Product/Service Category',
+    'Business Type (B2B, B2B2C)'
+]
+MODEL_FEATURES = NUMERICAL_FEATURES + CATEGORICAL_FEATURES
+FEATURE_VERSION = 1 # bump when the features change meaning; saved with each model
+
+# "Recent Funding / Investment" values meaning no funding (compared lower-cased)
+NO_FUNDING_VALUES = frozenset(["none reported", "n/a", ""])
+# Missing numbers are filled with the training mean, or with 0 where "unknown" means none
+MEAN_FILLED_FEATURES = ['Employees Count', 'Revenue_Numeric']
+ZERO_FILLED_FEATURES = ['Hiring Activity', 'Recent Employee Growth %']
+# Width of the hashed categorical encoding (category_tokens + FeatureHasher in train_model.py);
+# fixed however many distinct categories appear
+HASHED_CATEGORY_FEATURES = 1 << 14
+# What serving filled with before fitted statistics were saved with the model
+LEGACY_FEATURE_STATS = {"fill_values": {name: 0.0 for name in MEAN_FILLED_FEATURES + ZERO_FILLED_FEATURES}}
+
+
+def _column(df, name):
+    return df[name] if name in df.columns else pd.Series(np.nan, index=df.index, dtype=object)
+
+def _is_funded(series):
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    table = np.array([str(value).lower() not in NO_FUNDING_VALUES for value in uniques] + [False])
+    return table[codes].astype(int) # code -1 (missing) -> not funded
+
+def _raw_features(leads_df):
+    """Model features before missing numbers are filled (non-numeric values become NaN)."""
+    features = pd.DataFrame(index=leads_df.index)
+    features['Employees Count'] = parse_numeric_series(_column(leads_df, 'Employees Count'))
+    # Revenue strings such as "$15,000,000" or "$1.5M", in millions
+    features['Revenue_Numeric'] = parse_numeric_series(_column(leads_df, 'Revenue')) / 1_000_000
+    features['Hiring Activity'] = parse_numeric_series(_column(leads_df, 'Hiring Activity'))
+    features['Recent Employee Growth %'] = parse_numeric_series(_column(leads_df, 'Recent Employee Growth %'))
+    features['Is_Funded'] = _is_funded(_column(leads_df, 'Recent Funding / Investment'))
+    for name in CATEGORICAL_FEATURES:
+        features[name] = _column(leads_df, name)
+    return features
+
+def fit_feature_stats(leads_df):
+    """Statistics the feature pipeline learns from training leads; saved with the model."""
+    features = _raw_features(leads_df)
+    fill_values = {name: float(features[name].mean()) for name in MEAN_FILLED_FEATURES}
+    fill_values.update({name: 0.0 for name in ZERO_FILLED_FEATURES})
+    return {"fill_values": fill_values}
+
+class FeatureStatsAccumulator:
+    """fit_feature_stats over leads seen one chunk at a time (for corpora that do not fit in memory)."""
+
+    def __init__(self):
+        self._sums = {name: 0.0 for name in MEAN_FILLED_FEATURES}
+        self._counts = {name: 0 for name in MEAN_FILLED_FEATURES}
+
+    def partial_fit(self, leads_df):
+        features = _raw_features(leads_df)
+        for name in MEAN_FILLED_FEATURES:
+            self._sums[name] += float(features[name].sum())
+            self._counts[name] += int(features[name].count())
+        return self
+
+    def stats(self):
+        fill_values = {name: self._sums[name] / self._counts[name] if self._counts[name] else float("nan")
+                       for name in MEAN_FILLED_FEATURES} # NaN, like the mean of an all-missing column
+        fill_values.update({name: 0.0 for name in ZERO_FILLED_FEATURES})
+        return {"fill_values": fill_values}
+
+def build_features(leads_df, stats):
+    """The model's input frame (MODEL_FEATURES columns, same index) for raw lead rows."""
+    features = _raw_features(leads_df)
+    return features.fillna(stats["fill_values"])[MODEL_FEATURES]
+
+def category_tokens(categorical_df):
+    """Each row's categorical values as "column=value" strings, for a FeatureHasher (missing values are left out)."""
+    columns = [(name + "=" + categorical_df[name].astype(str)).where(categorical_df[name].notna()).tolist()
+               for name in categorical_df.columns]
+    return [[token for token in row if isinstance(token, str)] for row in zip(*columns)]
+
+CORPUS_FEATURES_CACHE_SIZE = 2 # one frame per resident model (see model_registry.DEFAULT_MAX_RESIDENT_MODELS)
+
+_corpus_features = OrderedDict() # (corpus version, fitted statistics as JSON) -> features, least recently used first
+_corpus_features_lock = threading.Lock()
+
+def corpus_features(stats):
+    """build_features over the whole enriched corpus (corpus order), built once per corpus version.
+
+    Frames of older corpus versions and of statistics not used recently (retrained models) are
+    evicted, so at most CORPUS_FEATURES_CACHE_SIZE frames stay in memory.
+    """
+    version = corpus_version()
+    key = (version, json.dumps(stats, sort_keys=True))
+    with _corpus_features_lock:
+        for stale_key in [cached_key for cached_key in _corpus_features if cached_key[0] != version]:
+            del _corpus_features[stale_key]
+        features = _corpus_features.get(key)
+        if features is None:
+            features = build_features(get_enriched_frame(), stats)
+            _corpus_features[key] = features
+        _corpus_features.move_to_end(key)
+        while len(_corpus_features) > CORPUS_FEATURES_CACHE_SIZE:
+            _corpus_features.popitem(last=False)
+        return features
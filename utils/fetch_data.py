@@ -1,435 +1,345 @@
-import json
+import hashlib
+import os
+import numpy as np
 import pandas as pd
-import datetime
+from utils.lead_store import get_store
+from utils.columnar import MISSING
+from utils.ranking_engine import (
+    RankedLeads, RankingSession, ScoreComponents, compute_static_features, profile_components, score_components, score_leads,
+    top_k_positions,
+)
+from utils.snapshot import load_enriched_leads, snapshot_path_for
+from utils.ranking_cache import get_ranking_cache, make_query_key, resolve_as_of
 
 # --- Constants ---
-RAW_LEADS_FILE = "data\\raw_leads.json"
-ENRICHED_LEADS_FILE = "data\\enriched_leads.json"
-
-# --- Helper Functions for Scoring Logic ---
-
-def _get_numeric_value(data, key, default=0):
-    """Safely extracts a numeric value from a dictionary or directly, handling common string formats."""
-    value = data.get(key, str(default)) if isinstance(data, dict) else str(data)
-
-    if isinstance(value, (int, float)):
-        return value
-    if isinstance(value, str):
-        # Remove commas, dollar signs, and convert common abbreviations
-        value = value.replace(",", "").replace("$", "").replace("M", "000000").replace("K", "000").strip()
-        try:
-            return float(value)
-        except ValueError:
-            pass
-    return default
-
-def _score_company_size(employees_count, preference):
-    """Scores based on preferred company size categories."""
-    if not preference: return 0
-
-    employees_count = _get_numeric_value(None, None, employees_count) # Use helper to ensure it's numeric
-    
-    if "Small" in preference and 1 <= employees_count <= 50:
-        return 20
-    elif "Medium" in preference and 51 <= employees_count <= 500:
-        return 20
-    elif "Large" in preference and employees_count > 500:
-        return 20
-    elif "Specific Range" in preference: # For M&A, needs more robust parsing for ranges like "50-200 employees"
-        return 10 # Default for range not perfectly matched here
-    return 0
-
-def _score_revenue_threshold(revenue, threshold_str):
-    revenue = _get_numeric_value(None, None, revenue)
-    if not threshold_str: return 0
-
-    # Define thresholds for ranges
-    revenue_map = {
-        "Under $1M": (0, 1000000),
-        "$1M - $5M": (1000000, 5000000),
-        "$5M - $10M": (5000000, 10000000),
-        "$10M - $50M": (10000000, 50000000),
-        "$50M - $100M": (50000000, 100000000),
-        "Over $100M": (100000000, float('inf'))
-    }
-
-    if threshold_str in revenue_map:
-        min_val, max_val = revenue_map[threshold_str]
-        return 25 if min_val <= revenue < max_val else 0
-    return 0 # No match
-
-def _score_investment_stage(year_founded, employees_count, revenue, funding_status, stage_preference):
-    """Infers company stage and scores based on user preference."""
-    if not stage_preference: return 0
-
-    year_founded = _get_numeric_value(None, None, year_founded)
-    employees_count = _get_numeric_value(None, None, employees_count)
-    revenue = _get_numeric_value(None, None, revenue)
-    
-    company_stage = "Unknown"
-    # Basic inference logic (can be made more sophisticated)
-    funding_lower = funding_status.lower()
-
-    if year_founded >= 2020 and employees_count < 50 and revenue < 1000000 and "seed" in funding_lower:
-        company_stage = "Seed/Angel"
-    elif 2015 <= year_founded < 2020 and 50 <= employees_count < 200 and 1000000 <= revenue < 10000000 and ("series a" in funding_lower or "series b" in funding_lower):
-        company_stage = "Series A/B"
-    elif employees_count >= 200 and revenue >= 10000000 and ("series c" in funding_lower or "growth equity" in funding_lower):
-        company_stage = "Growth Equity"
-    elif employees_count >= 500 and revenue >= 50000000 and "public" in funding_lower:
-        company_stage = "Mature/Public Ready"
-
-    return 25 if company_stage == stage_preference else 0
-
-def _score_growth_rate(growth_percentage):
-    """Scores based on employee growth percentage."""
-    growth_percentage = _get_numeric_value(None, None, growth_percentage)
-    if growth_percentage > 20: return 25 # Very High Growth
-    if growth_percentage > 10: return 15 # High Growth
-    if growth_percentage > 0: return 5  # Moderate Growth
-    if growth_percentage < 0: return -10 # Negative Growth
-    return 0
-
-def _score_hiring_activity(hiring_activity_score):
-    """Scores based on numerical hiring activity (0-10 scale)."""
-    hiring_activity_score = _get_numeric_value(None, None, hiring_activity_score)
-    if hiring_activity_score >= 8: return 30 # Very High Activity
-    if hiring_activity_score >= 6: return 20 # High Activity
-    if hiring_activity_score >= 4: return 10 # Moderate Activity
-    if hiring_activity_score > 0: return 5  # Low Activity but present
-    return 0
-
-def _score_recent_funding(funding_desc):
-    """Scores based on recent funding status."""
-    if "series d" in funding_desc.lower() or "($100m)" in funding_desc.lower(): # Top tier funding
-        return 40
-    if "series c" in funding_desc.lower() or "($50m)" in funding_desc.lower(): # Strong mid-tier funding
-        return 35
-    if "series b" in funding_desc.lower() or "($20m)" in funding_desc.lower() or "($30m)" in funding_desc.lower(): # Mid-tier funding
-        return 30
-    if "seed" in funding_desc.lower() or "series a" in funding_desc.lower() or "($5m)" in funding_desc.lower() or "($2m)" in funding_desc.lower(): # Early stage funding
-        return 20
-    if "secured" in funding_desc.lower() or "raised capital" in funding_desc.lower() or "grant" in funding_desc.lower(): # General positive funding
-        return 10
-    if "publicly traded" in funding_desc.lower(): # Established company
-        return 5
-    return 0
+RAW_LEADS_FILE = os.path.join("data", "raw_leads.json")
+ENRICHED_LEADS_FILE = os.path.join("data", "enriched_leads.json")
 
 # --- Core Data Fetching Functions ---
 
+def _normalize_company_name(name):
+    return name.strip().lower()
+
+def _build_company_index(all_leads):
+    """Maps each normalized company_name to the positions of its enriched records."""
+    codes, names = all_leads.column("company_name")
+    normalized = [_normalize_company_name(name) for name in names]
+    index = {}
+    for position, code in enumerate(codes.tolist()):
+        name = normalized[code] if code != MISSING else ""
+        index.setdefault(name, []).append(position)
+    return index
+
+def _enriched_store():
+    # Served from the compiled columnar snapshot when one is present (see utils/snapshot.py)
+    return get_store(ENRICHED_LEADS_FILE, load_enriched_leads, watch_paths=(snapshot_path_for(ENRICHED_LEADS_FILE),))
+
+def _ingest_enriched(all_leads):
+    """Ingest stage: attaches the query-independent score components to every lead."""
+    return all_leads.with_features(compute_static_features(all_leads))
+
+class _SubstringIndex:
+    """Inverted index over one text field that answers `query in value.lower()` lookups.
+
+    Postings are kept per distinct lower-cased value, so a substring query only scans the
+    (small) vocabulary of values and unions their postings. Results are memoized per query.
+    """
+
+    def __init__(self, leads, field):
+        postings = {}
+        for position, lead in enumerate(leads):
+            postings.setdefault(lead.get(field, "").lower(), []).append(position)
+        self._postings = postings
+        self._matches = {}
+
+    def lookup(self, query):
+        query = query.lower()
+        matches = self._matches.get(query)
+        if matches is None:
+            matches = set()
+            for value, positions in self._postings.items():
+                if query in value: # "" (the "All" option) matches every value
+                    matches.update(positions)
+            matches = frozenset(matches)
+            self._matches[query] = matches
+        return matches
+
+def _build_sector_region_index(all_leads):
+    return {"sector": _SubstringIndex(all_leads, "sector"), "region": _SubstringIndex(all_leads, "region")}
+
 def fetch_raw_leads(sector, region):
-    with open(RAW_LEADS_FILE, "r") as file:
-        all_leads = json.load(file)
-        # Filter by sector and region (using the raw_leads format)
-        filtered = [
-            lead for lead in all_leads
-            if sector.lower() in lead.get("sector", "").lower()
-            and region.lower() in lead.get("region", "").lower()
-        ]
-    return filtered
+    store = get_store(RAW_LEADS_FILE)
+    all_leads = store.records()
+    index = store.derived("sector_region_index", _build_sector_region_index)
+    # Filter by sector and region (using the raw_leads format)
+    filtered = index["sector"].lookup(sector) & index["region"].lookup(region)
+    return [all_leads[position] for position in sorted(filtered)]
+
+def get_enriched_table():
+    """The whole ingested enriched corpus as a ColumnarLeads table (shared; treat as read-only)."""
+    return _enriched_store().derived("ingested", _ingest_enriched) # built once per corpus version
+
+def get_enriched_frame():
+    """get_enriched_table() as a DataFrame (row i = corpus position i), built once per corpus version."""
+    return _enriched_store().derived("frame", lambda _: get_enriched_table().to_frame())
+
+def _enriched_positions(company_names):
+    """Sorted positions in get_enriched_table() of the enriched leads for `company_names`."""
+    company_index = _enriched_store().derived("company_index", _build_company_index)
+    # Ensure exact company name matching from the raw_leads (company_name) to enriched (Company)
+    positions = set()
+    for name in company_names:
+        positions.update(company_index.get(_normalize_company_name(name), ()))
+    return np.array(sorted(positions), dtype=np.intp)
+
+def fetch_enriched_table(company_names):
+    """Returns the enriched leads for `company_names` as a ColumnarLeads table (file order)."""
+    return get_enriched_table().take(_enriched_positions(company_names))
+
+def fetch_slice_positions(sector, region):
+    """(number of raw leads matched, sorted enriched positions) for one sector/region slice."""
+    filtered_raw_leads = fetch_raw_leads(sector, region)
+    return len(filtered_raw_leads), _enriched_positions([lead["company_name"] for lead in filtered_raw_leads])
 
 def fetch_enriched_leads(company_names):
-    with open(ENRICHED_LEADS_FILE, "r") as f:
-        all_leads = json.load(f)
-    # Ensure exact company name matching from the raw_leads (company_name) to enriched (Company)
-    clean_company_names = [name.strip().lower() for name in company_names]
-    return [lead for lead in all_leads if lead.get("company_name", "").strip().lower() in clean_company_names]
+    # Each row is materialized as a fresh dict, so ranking can add its "Rank Score" key
+    # without touching the shared store
+    return list(fetch_enriched_table(company_names))
 
 # --- Ranking Function (Main Logic) ---
 
 # Updated function signature to accept sector and region directly
-def rank_enriched_leads(leads, purpose, user_inputs, sector, region):
+def rank_enriched_leads(leads, purpose, user_inputs, sector, region, top_k=None, as_of=None):
+    """Scores leads with the vectorized engine (utils/ranking_engine.py) and sorts them best-first.
+
+    With top_k, only the k best leads are selected (without sorting the rest) and returned.
+    """
+    scores = score_leads(leads, purpose, user_inputs, sector, region, as_of)
     ranked = []
-    
-    for lead in leads:
-        score = 0
-        
-        # --- Common Factors (for all purposes) ---
-        
-        # Data Completeness
-        essential_fields = [
-            "Company", "Website", "Industry", "Employees Count", "Revenue",
-            "Year Founded", "City", "State", "Company Phone", "Owner's Email"
-        ]
-        filled_essential_fields = sum(1 for field in essential_fields if lead.get(field) not in [None, "", "0", 0])
-        score += (filled_essential_fields / len(essential_fields)) * 10 # Max 10 points for completeness
-
-        # Recency (Using 'Updated' field)
-        try:
-            updated_date_str = lead.get("Updated")
-            if updated_date_str:
-                updated_date = datetime.datetime.strptime(updated_date_str, "%Y-%m-%d")
-                days_since_update = (datetime.datetime.now() - updated_date).days
-                if days_since_update < 90: # Updated in last 3 months
-                    score += 10
-                elif days_since_update < 365: # Updated in last year
-                    score += 5
-        except (ValueError, TypeError): # Handle invalid date formats or missing 'Updated' field
-            pass 
-
-        # Industry Match (from initial search)
-        company_industry_enriched = lead.get("Industry", "").lower()
-        if sector.lower() in company_industry_enriched: # Check if the selected sector is present in enriched industry
-            score += 20
-        elif any(s in company_industry_enriched for s in sector.lower().split()): # Basic related check
-            score += 10
-
-        # Location Match (from initial search)
-        company_city = lead.get("City", "").lower()
-        company_state = lead.get("State", "").lower()
-        region_lower = region.lower()
-
-        if region_lower in company_city.lower() or region_lower in company_state.lower():
-            score += 20
-        elif region_lower.split(" ")[0] in company_city.lower() or region_lower.split(" ")[0] in company_state.lower(): # Partial match (e.g., "San Francisco" in "San Francisco, CA")
-            score += 10
-        
-
-        # --- Purpose-Specific Scoring ---
-
-        if purpose == "Job Search":
-            # Extra Input: Company Size (user_inputs["company_size_preference"])
-            employees_count = _get_numeric_value(lead, "Employees Count")
-            score += _score_company_size(employees_count, user_inputs.get("company_size_preference", ""))
-
-            # Hiring Activity (Numerical)
-            hiring_activity_value = _get_numeric_value(lead, "Hiring Activity")
-            score += _score_hiring_activity(hiring_activity_value)
-
-            # Recent Employee Growth %
-            employee_growth_perc = _get_numeric_value(lead, "Recent Employee Growth %")
-            score += _score_growth_rate(employee_growth_perc)
-
-            # Owner's LinkedIn Availability
-            if lead.get("Owner's LinkedIn"):
-                score += 10
-
-            # Year Founded (Desirable age for job seekers - examples for growth/established)
-            year_founded = _get_numeric_value(lead, "Year Founded")
-            current_year = datetime.datetime.now().year
-            if current_year - year_founded <= 10 and year_founded > 0: # Founded in last 10 years (growth-oriented)
-                score += 15 
-            elif current_year - year_founded > 20 and year_founded > 0: # Established (stability)
-                score += 10 
-
-            # Professional Presence (Website available, Company LinkedIn available)
-            if lead.get("Website") and "http" in lead["Website"]:
-                score += 5
-            else: 
-                score -= 5 # Penalty for no website
-
-            if lead.get("Company LinkedIn"):
-                score += 5
-
-            # BBB Rating (Good reputation)
-            bbb_rating = lead.get("BBB Rating", "").upper()
-            if "A" in bbb_rating: score += 5
-            elif "F" in bbb_rating or "D" in bbb_rating: score -= 10
-
-
-        elif purpose == "Investor Research":
-            # Extra Inputs: Investment Stage (user_inputs["investment_stage"]), Revenue Threshold/Valuation (user_inputs["revenue_threshold_valuation"])
-            
-            revenue = _get_numeric_value(lead, "Revenue")
-            score += _score_revenue_threshold(revenue, user_inputs.get("revenue_threshold_valuation", ""))
-            
-            year_founded = _get_numeric_value(lead, "Year Founded")
-            employees_count = _get_numeric_value(lead, "Employees Count")
-            funding_status = lead.get("Recent Funding / Investment", "").lower() 
-            score += _score_investment_stage(year_founded, employees_count, revenue, funding_status, user_inputs.get("investment_stage", ""))
-
-            # Recent Funding / Investment (Crucial Extra Field)
-            score += _score_recent_funding(funding_status)
-
-            # Recent Employee Growth % (Crucial Extra Field)
-            employee_growth_perc = _get_numeric_value(lead, "Recent Employee Growth %")
-            score += _score_growth_rate(employee_growth_perc)
-
-            # Owner's LinkedIn / Title (Strong leadership, decision-maker)
-            owner_title = lead.get("Owner's Title", "").lower()
-            if lead.get("Owner's LinkedIn") and any(title in owner_title for title in ["ceo", "founder", "cto", "president", "managing director"]):
-                score += 15
-            elif lead.get("Owner's LinkedIn"): # Any owner LinkedIn is a plus
-                score += 5
-
-            # Product/Service Category (Innovation/Disruption) - based on keywords
-            product_category = lead.get("Product/Service Category", "").lower()
-            if any(keyword in product_category for keyword in ["ai", "robotics", "genomics", "clean energy", "biotech", "fintech"]): 
-                score += 15
-
-            # High Revenue & Employee Count (General health, higher is often better for later stages)
-            if revenue > 50000000: score += 10 # High revenue
-            if employees_count > 300: score += 5 # Large employee base
-            
-            # Website quality / professionalism (Implied by presence)
-            if lead.get("Website") and "http" in lead["Website"]:
-                score += 5
-
-
-        elif purpose == "Sales Prospecting":
-            # Extra Inputs: Buyer Type (user_inputs["buyer_type"]), Your Product (user_inputs["your_product_category"])
-
-            # Buyer Type Match
-            company_business_type = lead.get("Business Type (B2B, B2B2C)", "").lower()
-            user_buyer_type = user_inputs.get("buyer_type", "").lower()
-            if company_business_type == user_buyer_type:
-                score += 30
-            elif user_buyer_type == "b2b" and company_business_type == "b2b2c": 
-                score += 15
-            elif user_buyer_type == "b2c" and company_business_type == "b2b2c":
-                score += 10
-
-
-            # Relevance to Your Product (This is critical and needs specific mapping based on your product)
-            your_product = user_inputs.get("your_product_category", "").lower()
-            product_category = lead.get("Product/Service Category", "").lower()
-            industry = lead.get("Industry", "").lower()
-
-            # Example rules (adjust these to your actual product's target market)
-            if "crm software" in your_product and ("sales" in product_category or "marketing" in product_category or "client management" in product_category or "consulting" in industry): score += 35
-            elif "cloud security" in your_product and ("software" in industry or "technology" in industry or "cybersecurity" in product_category or "it services" in industry): score += 35
-            elif "hr software" in your_product and (_get_numeric_value(lead, "Employees Count") > 50 or "human resources" in product_category): score += 35
-            
-            # If no specific relevance rules, check general fit based on size/revenue
-            employees_count = _get_numeric_value(lead, "Employees Count")
-            revenue = _get_numeric_value(lead, "Revenue")
-            # Example: Your product targets mid-market companies (50-500 employees, >$1M revenue)
-            if 50 <= employees_count <= 500 and revenue > 1000000: score += 25 
-
-
-            # Contact Information Availability (Owner's Email & Phone are highly valuable)
-            if lead.get("Owner's Email") and lead.get("Owner's Phone Number"):
-                score += 20
-            elif lead.get("Owner's LinkedIn"): 
-                score += 10
-            elif lead.get("Company Phone") or lead.get("Owner's Email"): # Company Email assumed to be mapped to Owner's Email for simplicity
-                score += 5
-            else: 
-                score -= 15
-
-            # Website Availability & Quality
-            if lead.get("Website") and "http" in lead["Website"]:
-                score += 10
-            else:
-                score -= 10 
-
-            # BBB Rating (important for trustworthiness)
-            bbb_rating = lead.get("BBB Rating", "").upper()
-            if "A" in bbb_rating: score += 5
-            elif "D" in bbb_rating or "F" in bbb_rating: score -= 10
-
-            # Hiring Activity (Indicates pain point or growth that needs solutions)
-            hiring_activity_value = _get_numeric_value(lead, "Hiring Activity")
-            if hiring_activity_value >= 7: # High activity, might need solutions
-                score += 10 
-
-        elif purpose == "Merger and Acquisition/Partnership":
-            # Extra Inputs: Size of Target (user_inputs["target_size_preference"]), Type of Alliance Sought (user_inputs["type_of_alliance"])
-            
-            employees_count = _get_numeric_value(lead, "Employees Count")
-            revenue = _get_numeric_value(lead, "Revenue")
-            year_founded = _get_numeric_value(lead, "Year Founded")
-
-            # Size of Target Match
-            score += _score_company_size(employees_count, user_inputs.get("target_size_preference", ""))
-            
-            # Type of Alliance Sought Match (Requires detailed logic based on lead characteristics)
-            alliance_type = user_inputs.get("type_of_alliance", "").lower()
-            product_category = lead.get("Product/Service Category", "").lower()
-            
-            if alliance_type == "acquisition target":
-                # Ideal: Smaller, high growth, innovative tech, potentially seeking exit
-                if year_founded >= 2018 and employees_count < 100 and ("ai" in product_category or "innovative" in product_category or "robotics" in product_category): score += 30
-                funding_score = _score_recent_funding(lead.get("Recent Funding / Investment", ""))
-                if funding_score > 0: # If they just raised, could be more valuable but more expensive
-                    score += funding_score * 0.5 # Add half the funding score
-                else: # No recent funding might make them more amenable
-                    score += 10 
-
-            elif alliance_type == "strategic partner":
-                # Ideal: Established, complementary product, similar target audience, similar size/growth
-                if year_founded <= 2018 and 50 <= employees_count <= 500 and "complementary" in product_category: score += 30 # "complementary" keyword would need defining
-                # Check for strong LinkedIn presence / website for a good partner
-                if lead.get("Company LinkedIn") and lead.get("Website"): score += 10
-            
-            # Product/Service Category Synergy (Crucial for M&A/Partnership) - highly customized
-            # Example: User is in "Healthcare AI" looking for "Diagnostic Software" partners
-            # This requires more complex logic, perhaps mapping `sector` and `Industry` with `Product/Service Category`
-            if sector.lower() == "healthcare" and "ai" in product_category: # Assuming the sector input from app.py is "Healthcare"
-                if "medical device software" in product_category or "telehealth" in product_category:
-                    score += 25
-
-
-            # Revenue & Employee Count (General health, appropriate scale)
-            if revenue > 10000000: score += 10 # Solid revenue
-            if employees_count > 50: score += 5 # Established team
-            
-            # Recent Funding / Investment
-            funding_status = lead.get("Recent Funding / Investment", "").lower()
-            score += _score_recent_funding(funding_status)
-            
-            # Recent Employee Growth %
-            employee_growth_perc = _get_numeric_value(lead, "Recent Employee Growth %")
-            if employee_growth_perc > 10: score += 10 # Growing, good for most alliances
-
-            # Owner's LinkedIn / Title (Access to decision-makers)
-            if lead.get("Owner's LinkedIn") and lead.get("Owner's Title"):
-                score += 10
-
-
-        elif purpose == "Market Research / Competitive Analysis":
-            # Extra Inputs: Your Niche (user_inputs["your_niche"]), Your Revenue (user_inputs["your_revenue"])
-            
-            # Your Niche Match (Crucial for identifying competitors/market segments)
-            company_product_category = lead.get("Product/Service Category", "").lower()
-            your_niche = user_inputs.get("your_niche", "").lower()
-
-            if your_niche in company_product_category: # Direct competitor/niche match
-                score += 35
-            elif any(keyword in company_product_category for keyword in your_niche.split()): # Keyword match within broader niche
-                score += 20
-            
-            # Revenue Comparison (to your revenue for competitor analysis)
-            company_revenue = _get_numeric_value(lead, "Revenue")
-            your_revenue = _get_numeric_value(None, None, user_inputs.get("your_revenue", 0))
-
-            if your_revenue > 0:
-                revenue_diff_ratio = abs(company_revenue - your_revenue) / your_revenue if your_revenue > 0 else float('inf')
-                if revenue_diff_ratio < 0.2: # Within 20% - direct competitor size
-                    score += 20
-                elif company_revenue > your_revenue * 2: # Much larger (market leader)
-                    score += 15
-                elif company_revenue < your_revenue * 0.5 and company_revenue > 0: # Smaller (emerging/niche player)
-                    score += 10
-            elif company_revenue > 0: # If user revenue is 0, just look at company revenue for general market insights
-                score += 5
-
-
-            # Hiring Activity (Strategic insights into their growth/focus areas)
-            hiring_activity_value = _get_numeric_value(lead, "Hiring Activity")
-            score += _score_hiring_activity(hiring_activity_value) # Higher score for more activity
-
-            # Recent Funding / Investment (Signals market interest, potential for aggressive moves)
-            funding_status = lead.get("Recent Funding / Investment", "").lower()
-            score += _score_recent_funding(funding_status)
-
-            # Recent Employee Growth % (Traction, market share gain)
-            employee_growth_perc = _get_numeric_value(lead, "Recent Employee Growth %")
-            score += _score_growth_rate(employee_growth_perc) # High growth gets higher score
-
-            # Year Founded (New entrants vs. established players)
-            year_founded = _get_numeric_value(lead, "Year Founded")
-            current_year = datetime.datetime.now().year
-            if current_year - year_founded <= 5 and year_founded > 0: score += 10 # New entrant/disruptor
-            elif current_year - year_founded > 20 and year_founded > 0: score += 10 # Established player/market leader
-
-            # Website / Company LinkedIn (Ease of research, strong public presence)
-            if lead.get("Website") and lead.get("Company LinkedIn"):
-                score += 10
-
-
-        lead["Rank Score"] = max(0, score) # Ensure score doesn't go negative
+    for position in top_k_positions(scores, top_k):
+        lead = leads[position]
+        lead["Rank Score"] = float(scores[position])
         ranked.append(lead)
-
-    ranked.sort(key=lambda x: x["Rank Score"], reverse=True)
-    return ranked
\ No newline at end of file
+    return ranked
+
+def rank_enriched_leads_paged(leads, purpose, user_inputs, sector, region, as_of=None):
+    """Like rank_enriched_leads, but returns a RankedLeads to page through with .page(cursor, limit).
+
+    The RankedLeads keeps the score components, so it can be re-weighted and broken down.
+    """
+    return RankedLeads.from_components(leads, score_components(leads, purpose, user_inputs, sector, region, as_of))
+
+# --- Streaming Pipeline ---
+# fetch -> enrich -> rank as one generator: raw leads are scanned in chunks, each chunk is
+# joined to its enriched rows and scored, and only the best top_k (positions + scores) are
+# kept between chunks. No full copy of the slice is materialized at any stage.
+
+STREAM_CHUNK_SIZE = 50_000
+SEARCH_TOP_K = 1000 # leads a search keeps ranked for paging (the ranking cube keeps as many)
+
+def _merge_kept(parts, top_k):
+    """Merges (positions, scores, components) parts into the best top_k leads, in file order.
+
+    Ties are broken by file order, so the result ranks like scoring all parts at once.
+    """
+    positions = np.concatenate([part[0] for part in parts])
+    scores = np.concatenate([part[1] for part in parts])
+    order = np.argsort(positions, kind="stable")
+    if top_k is not None and len(order) > top_k:
+        order = order[np.sort(top_k_positions(scores[order], top_k))]
+    components = ScoreComponents.concatenate([part[2] for part in parts]).take(order)
+    return positions[order], scores[order], components
+
+class RankingProgress:
+    """Progress of a streamed ranking after one chunk; ranked() materializes the current top-K."""
+
+    def __init__(self, raw_scanned, raw_total, raw_matched, leads_scored, leads, parts):
+        self.raw_scanned = raw_scanned # raw leads read so far, out of raw_total
+        self.raw_total = raw_total
+        self.raw_matched = raw_matched # raw leads matching the sector/region so far
+        self.leads_scored = leads_scored # enriched leads joined and scored so far
+        self._leads = leads
+        self._parts = parts # kept (positions, scores, components), merged on demand
+
+    @property
+    def done(self):
+        return self.raw_scanned >= self.raw_total
+
+    def ranked(self):
+        """RankedLeads over the best leads found so far."""
+        if not self._parts:
+            return RankedLeads(self._leads.take(np.empty(0, dtype=np.intp)), np.empty(0))
+        positions, scores, components = _merge_kept(self._parts, None)
+        return RankedLeads(self._leads.take(positions), scores, components)
+
+def _iter_raw_chunks(sector, region, chunk_size):
+    """Yields (raw leads scanned, raw total, matching raw leads of the chunk) in file order."""
+    store = get_store(RAW_LEADS_FILE)
+    all_leads = store.records()
+    index = store.derived("sector_region_index", _build_sector_region_index)
+    matches = index["sector"].lookup(sector) & index["region"].lookup(region)
+    if not all_leads:
+        yield 0, 0, []
+    for start in range(0, len(all_leads), chunk_size):
+        stop = min(start + chunk_size, len(all_leads))
+        yield stop, len(all_leads), [all_leads[position] for position in range(start, stop) if position in matches]
+
+def stream_ranked_leads(sector, region, purpose, user_inputs, top_k=None, chunk_size=STREAM_CHUNK_SIZE, as_of=None):
+    """Generator version of fetch -> enrich -> rank that yields a RankingProgress per raw chunk.
+
+    Each chunk is cut to its own best top_k and merged into the running top_k, so memory and
+    work per chunk are O(top_k) plus the chunk. With top_k None every scored chunk is kept and
+    only concatenated when ranked() is called. The last RankingProgress ranks exactly like
+    rank_enriched_leads over the whole slice (ties keep file order).
+    """
+    all_enriched = get_enriched_table()
+    company_index = _enriched_store().derived("company_index", _build_company_index)
+    joined = np.zeros(len(all_enriched), dtype=bool) # enriched rows already scored by an earlier chunk
+    parts = [] # scored chunks still kept; a single running top-K part when top_k is set
+    raw_matched = leads_scored = 0
+    for raw_scanned, raw_total, raw_chunk in _iter_raw_chunks(sector, region, chunk_size):
+        raw_matched += len(raw_chunk)
+        positions = set()
+        for lead in raw_chunk:
+            positions.update(company_index.get(_normalize_company_name(lead["company_name"]), ()))
+        positions = np.array(sorted(positions), dtype=np.intp)
+        positions = positions[~joined[positions]]
+        if len(positions):
+            joined[positions] = True
+            leads_scored += len(positions)
+            components = score_components(all_enriched.take(positions), purpose, user_inputs, sector, region, as_of)
+            part = (positions, components.scores(), components)
+            if top_k is None:
+                parts.append(part)
+            else:
+                parts = [_merge_kept(parts + [_merge_kept([part], top_k)], top_k)]
+        yield RankingProgress(raw_scanned, raw_total, raw_matched, leads_scored, all_enriched, list(parts))
+
+# --- Cached Search Pipeline ---
+
+def _hash_signatures(signatures):
+    return hashlib.sha1(repr(signatures).encode("utf-8")).hexdigest()[:16]
+
+def corpus_version():
+    """Short hash identifying the raw + enriched lead files currently on disk."""
+    signatures = []
+    for store in (get_store(RAW_LEADS_FILE), _enriched_store()):
+        store.records() # reloads first if the files changed
+        signatures.append(store.version)
+    return _hash_signatures(signatures)
+
+def corpus_version_on_disk():
+    """corpus_version() without loading the lead files (for jobs that stream the corpus instead)."""
+    return _hash_signatures([store.disk_version() for store in (get_store(RAW_LEADS_FILE), _enriched_store())])
+
+def find_and_rank_leads(sector, region, purpose, user_inputs, as_of=None, on_progress=None, top_k=SEARCH_TOP_K):
+    """Runs fetch -> enrich -> rank for one search, memoized in the "rules" ranking cache.
+
+    Returns (number of raw leads matched, RankedLeads of the best top_k leads; all of them
+    when top_k is None). Date-based rules are scored as of `as_of` (default: today), which is
+    part of the cache key so results stay stable all day. On a cache miss the pipeline is
+    streamed and on_progress(RankingProgress) is called after every chunk.
+    """
+    as_of = resolve_as_of(as_of)
+    key = make_query_key(corpus_version(), sector, region, purpose, user_inputs, as_of, top_k)
+
+    def run_pipeline():
+        for progress in stream_ranked_leads(sector, region, purpose, user_inputs, top_k, as_of=as_of):
+            if on_progress is not None:
+                on_progress(progress)
+        return progress.raw_matched, progress.ranked()
+
+    return get_ranking_cache("rules").get_or_compute(key, run_pipeline)
+
+def rank_profiles(sector, region, profiles, as_of=None):
+    """Ranks one sector/region slice for many saved query profiles with a single corpus pass.
+
+    `profiles` is a list of dicts with "purpose" and optional "user_inputs". The slice is
+    fetched, joined and featurized once, and the purpose-independent points are shared.
+    Returns (number of raw leads matched, [RankedLeads per profile]); every result is also
+    stored in the "rules" ranking cache, and cached profiles are not recomputed.
+    """
+    as_of = resolve_as_of(as_of)
+    version = corpus_version()
+    cache = get_ranking_cache("rules")
+    keys = [make_query_key(version, sector, region, profile["purpose"], profile.get("user_inputs", {}), as_of) for profile in profiles]
+    results = [cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        filtered_raw_leads = fetch_raw_leads(sector, region)
+        enriched = fetch_enriched_table([lead["company_name"] for lead in filtered_raw_leads])
+        all_components = profile_components(enriched, [profiles[i] for i in missing], sector, region, as_of)
+        for i, components in zip(missing, all_components):
+            results[i] = (len(filtered_raw_leads), RankedLeads.from_components(enriched, components))
+            cache.put(keys[i], results[i])
+    raw_count = results[0][0] if results else 0
+    return raw_count, [ranked for _, ranked in results]
+
+class SearchSession:
+    """One search in the app, kept open so criteria and weight changes re-rank incrementally.
+
+    Holds a RankingSession over the search's slice, built on first use; rerank() only
+    re-evaluates the rules that read a changed input and shares results with the "rules"
+    ranking cache. When the search kept only its top-K of a larger slice, the session covers
+    the whole slice instead (other criteria or weights can promote other leads), and its
+    first use evaluates every rule once.
+    """
+
+    def __init__(self, sector, region, purpose, user_inputs, raw_count, ranking, as_of=None):
+        self.raw_count = raw_count
+        self.corpus_version = corpus_version()
+        self.sector = sector
+        self.region = region
+        self.as_of = resolve_as_of(as_of)
+        self.purpose = purpose
+        self.user_inputs = dict(user_inputs)
+        self.ranking = ranking # of the current criteria; the search's top-K until the session is used
+        self._ranking_session = None
+
+    @property
+    def evaluated(self):
+        """Names of the rules the last rerank() evaluated (empty when served from cache)."""
+        return self._ranking_session.evaluated if self._ranking_session is not None else []
+
+    def _stale(self):
+        return resolve_as_of() != self.as_of or corpus_version() != self.corpus_version
+
+    def _session(self):
+        if self._ranking_session is None:
+            _, positions = fetch_slice_positions(self.sector, self.region)
+            if len(positions) > len(self.ranking):
+                self._ranking_session = RankingSession(get_enriched_table().take(positions), self.sector, self.region, self.as_of)
+            else:
+                self._ranking_session = RankingSession.from_ranking(
+                    self.ranking, self.purpose, self.user_inputs, self.sector, self.region, self.as_of)
+        return self._ranking_session
+
+    def full_ranking(self):
+        """RankedLeads (with components) of the whole slice for the current criteria, or None when stale.
+
+        Re-weighting must start from this rather than from a top-K ranking: new weights can
+        promote leads the top-K dropped.
+        """
+        if self._stale():
+            return None
+        session = self._session()
+        if len(self.ranking) < len(session.leads):
+            self.ranking = session.rank(self.purpose, self.user_inputs)
+        return self.ranking
+
+    def rerank(self, purpose, user_inputs):
+        """RankedLeads of the whole slice for new criteria, or None when the session is stale (new day or new corpus)."""
+        if self._stale():
+            return None
+        session = self._session()
+        key = make_query_key(self.corpus_version, self.sector, self.region, purpose, user_inputs, self.as_of)
+        cache = get_ranking_cache("rules")
+        cached = cache.get(key)
+        if cached is not None:
+            ranking = cached[1]
+            session.load(purpose, user_inputs, ranking.components)
+        else:
+            ranking = session.rank(purpose, user_inputs)
+            cache.put(key, (self.raw_count, ranking))
+        self.purpose, self.user_inputs, self.ranking = purpose, dict(user_inputs), ranking
+        return ranking
@@ -0,0 +1,168 @@
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+# --- Flattened Forest Model ---
+# The ML ranking model (StandardScaler + OneHotEncoder ColumnTransformer feeding a
+# RandomForestRegressor) compiled into plain NumPy arrays. export_pipeline reads the fitted
+# sklearn objects once; FlatForest then predicts with NumPy only, so serving never imports
+# or unpickles sklearn.
+#
+# All trees are concatenated into one node table (feature split, threshold, children, leaf
+# value). A batch of rows walks every tree in lock-step, one vectorized step per tree level,
+# dropping (row, tree) pairs as they reach a leaf. One-hot columns are never materialized: a
+# split on "Industry == Software" compares the row's category code with the node's code.
+# Comparisons use float32 inputs and tree order summation, like sklearn's own predict.
+#
+# A saved model is a directory of plain .npy files (plus meta.json) that load_flat_model
+# memory-maps: loading is near-instant whatever the model size, and every process serving the
+# same model shares one copy of its pages through the OS page cache.
+
+FLAT_MODEL_SUFFIX = ".flat" # a directory
+PREDICT_BLOCK_ROWS = 8192 # rows walked through the forest at once (bounds the (rows, trees) arrays)
+
+
+def flat_model_path_for(model_path):
+    return os.path.splitext(model_path)[0] + FLAT_MODEL_SUFFIX
+
+def export_pipeline(pipeline, source_version=None, feature_stats=None):
+    """Compiles a fitted Pipeline(preprocessor, RandomForestRegressor) into a FlatForest.
+
+    feature_stats (from the model artifact) are stored alongside, so serving needs no pickle.
+    """
+    preprocessor, forest = pipeline.steps[0][1], pipeline.steps[-1][1]
+    transformers = {name: (transformer, columns) for name, transformer, columns in preprocessor.transformers_}
+    scaler, numeric_columns = transformers["num"]
+    encoder, categorical_columns = transformers["cat"]
+    categories = [[None if pd.isna(value) else str(value) for value in column] for column in encoder.categories_]
+
+    # Transformed feature index -> input column (numeric columns, then one per categorical
+    # column) and, for one-hot features, the category code the feature stands for
+    n_numeric = len(numeric_columns)
+    feature_column = list(range(n_numeric))
+    feature_code = [-1] * n_numeric
+    for column, values in enumerate(categories):
+        feature_column += [n_numeric + column] * len(values)
+        feature_code += list(range(len(values)))
+    feature_column, feature_code = np.array(feature_column, dtype=np.int32), np.array(feature_code, dtype=np.int32)
+
+    features, thresholds, lefts, rights, missing_left, values, roots = [], [], [], [], [], [], []
+    offset = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        nodes = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        roots.append(offset)
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        lefts.append(np.where(is_leaf, nodes, tree.children_left) + offset) # leaves loop on themselves
+        rights.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+        missing_left.append(getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=np.uint8)).astype(bool))
+        values.append(tree.value[:, 0, 0])
+        offset += tree.node_count
+    feature = np.concatenate(features)
+    threshold = np.concatenate(thresholds)
+    one_hot = feature_code[feature] >= 0
+    if not np.all((threshold[one_hot] >= 0) & (threshold[one_hot] < 1)):
+        raise ValueError("One-hot splits must separate 0 from 1") # the evaluator tests category equality
+    arrays = {
+        "numeric_mean": scaler.mean_.astype(np.float64), "numeric_scale": scaler.scale_.astype(np.float64),
+        "column": feature_column[feature], "code": feature_code[feature].astype(np.float32),
+        "threshold": threshold,
+        "left": np.concatenate(lefts).astype(np.int32), "right": np.concatenate(rights).astype(np.int32),
+        "missing_left": np.concatenate(missing_left), "value": np.concatenate(values), "roots": np.array(roots, dtype=np.int32),
+    }
+    meta = {
+        "numeric_columns": list(numeric_columns), "categorical_columns": list(categorical_columns),
+        "categories": categories, "max_depth": max(estimator.tree_.max_depth for estimator in forest.estimators_),
+        "source_version": source_version, "feature_stats": feature_stats,
+    }
+    return FlatForest(meta, arrays)
+
+
+class FlatForest:
+    """A forest compiled to arrays; predict(features_df) matches the sklearn pipeline's predict."""
+
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.arrays = arrays
+        self.numeric_columns = meta["numeric_columns"]
+        self.categorical_columns = meta["categorical_columns"]
+        self.source_version = meta.get("source_version") # model_version() of the pickle it was exported from
+        self.feature_stats = meta.get("feature_stats")
+        self._category_codes = [{value: code for code, value in enumerate(column)} for column in meta["categories"]]
+
+    def _inputs(self, features_df):
+        """Row matrix of scaled numeric values (float32) followed by categorical codes (-1: unknown value)."""
+        arrays = self.arrays
+        numeric = features_df[self.numeric_columns].to_numpy(dtype=np.float64)
+        numeric = ((numeric - arrays["numeric_mean"]) / arrays["numeric_scale"]).astype(np.float32)
+        codes = np.empty((len(features_df), len(self.categorical_columns)), dtype=np.float32)
+        for column, (name, lookup) in enumerate(zip(self.categorical_columns, self._category_codes)):
+            values, uniques = pd.factorize(features_df[name], use_na_sentinel=True)
+            table = np.array([lookup.get(str(value), -1) for value in uniques] + [lookup.get(None, -1)], dtype=np.float32)
+            codes[:, column] = table[values] # factorize code -1 (missing) -> the NaN category, if one was seen
+        return np.hstack([numeric, codes])
+
+    def _walk(self, inputs):
+        arrays = self.arrays
+        column, code, threshold = arrays["column"], arrays["code"], arrays["threshold"]
+        left, right, missing_left = arrays["left"], arrays["right"], arrays["missing_left"]
+        n_rows, width = inputs.shape
+        n_trees = len(arrays["roots"])
+        inputs = inputs.ravel()
+        node = np.tile(arrays["roots"], n_rows) # (row, tree) pairs, row-major
+        active = np.arange(len(node))
+        for _ in range(self.meta["max_depth"]):
+            current = node[active]
+            internal = left[current] != current # leaves point to themselves
+            active, current = active[internal], current[internal]
+            if not len(active):
+                break
+            value = inputs[active // n_trees * width + column[current]]
+            node_code = code[current]
+            # One-hot splits (code >= 0) test "has this category" <= threshold, i.e. go left when it does not
+            go_left = np.where(node_code >= 0, value != node_code, value <= threshold[current])
+            go_left = np.where(np.isnan(value), missing_left[current], go_left)
+            node[active] = np.where(go_left, left[current], right[current])
+        leaf_values = arrays["value"][node].reshape(n_rows, n_trees)
+        total = np.zeros(n_rows)
+        for tree in range(n_trees): # summed in tree order, like the forest's predict
+            total += leaf_values[:, tree]
+        return total / n_trees
+
+    def predict(self, features_df):
+        """Predicted ranks for a feature frame (see utils/features.py)."""
+        inputs = self._inputs(features_df)
+        predictions = np.empty(len(features_df))
+        for start in range(0, len(features_df), PREDICT_BLOCK_ROWS):
+            predictions[start:start + PREDICT_BLOCK_ROWS] = self._walk(inputs[start:start + PREDICT_BLOCK_ROWS])
+        return predictions
+
+def save_flat_model(model, path):
+    """Writes the model as directory `path`: meta.json plus one .npy file per array."""
+    tmp_path, old_path = path + ".tmp", path + ".old"
+    for stale_path in (tmp_path, old_path):
+        shutil.rmtree(stale_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name, array in model.arrays.items():
+        np.save(os.path.join(tmp_path, name + ".npy"), np.ascontiguousarray(array))
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump(model.meta, f)
+    # Write next to the target and swap the directory in so readers never see a half-written
+    # model (at worst none for a moment, and they fall back to the pickle). Processes still
+    # mapping the old files keep reading them until they reload.
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+def load_flat_model(path, mmap_mode="r"):
+    """Loads a saved model, memory-mapping its arrays (read-only) unless mmap_mode is None."""
+    with open(os.path.join(path, "meta.json"), "r") as f:
+        meta = json.load(f)
+    arrays = {os.path.splitext(name)[0]: np.load(os.path.join(path, name), mmap_mode=mmap_mode, allow_pickle=False)
+              for name in os.listdir(path) if name.endswith(".npy")}
+    return FlatForest(meta, arrays)
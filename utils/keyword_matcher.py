@@ -0,0 +1,49 @@
+import re
+from functools import lru_cache
+
+# --- Multi-pattern Keyword Matching ---
+# Scoring rules ask "does this text contain any of these keywords?" for many keyword groups
+# over the same field. A KeywordMatcher compiles every keyword of every group into a single
+# regex and reports all groups that occur in one scan of the text. Results are memoized per
+# distinct string, since category and funding strings repeat heavily across a corpus.
+
+MATCH_CACHE_SIZE = 65536
+
+
+class KeywordMatcher:
+    """Substring matcher for named keyword classes, e.g. {"innovation": ["ai", "robotics"]}.
+
+    Matching is case-insensitive and has the same semantics as `keyword in text.lower()`,
+    including overlapping keywords.
+    """
+
+    def __init__(self, classes):
+        self.classes = {name: [keyword.lower() for keyword in keywords] for name, keywords in classes.items()}
+        classes_by_keyword = {}
+        for name, keywords in self.classes.items():
+            for keyword in keywords:
+                classes_by_keyword.setdefault(keyword, set()).add(name)
+
+        # A zero-width lookahead tries the alternation at every offset, so matches may overlap.
+        # At one offset the regex reports the longest keyword that matches there; any shorter
+        # keyword matching at the same offset is a prefix of it, so its classes are folded in.
+        keywords = sorted(classes_by_keyword, key=len, reverse=True)
+        self._pattern = re.compile("(?=(" + "|".join(re.escape(keyword) for keyword in keywords) + "))") if keywords else None
+        self._classes_at = {
+            keyword: frozenset().union(*(classes_by_keyword[other] for other in keywords if keyword.startswith(other)))
+            for keyword in keywords
+        }
+        self._match_cached = lru_cache(maxsize=MATCH_CACHE_SIZE)(self._match)
+
+    def match(self, text):
+        """Returns the frozenset of class names with at least one keyword in `text` (none for non-strings)."""
+        # Checked before the cache, which would have to hash list or dict values
+        if not isinstance(text, str) or not text or self._pattern is None:
+            return frozenset()
+        return self._match_cached(text)
+
+    def _match(self, text):
+        found = set()
+        for keyword in set(self._pattern.findall(text.lower())):
+            found |= self._classes_at[keyword]
+        return frozenset(found)
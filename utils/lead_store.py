@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+
+# --- Process-wide Lead Store ---
+# Each lead file is parsed once per process and shared by every Streamlit session.
+# A file is only re-read when its modification time or size (or that of any extra watched
+# file, such as a compiled snapshot) changes on disk.
+# Structures derived from the records (indexes, lookups) are cached per loaded version.
+
+def _load_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+class LeadStore:
+    """Caches the parsed contents of a lead file and reloads it only when the file changes."""
+
+    def __init__(self, path, loader=_load_json, watch_paths=()):
+        self.path = path
+        self._loader = loader
+        self._watch_paths = tuple(watch_paths)
+        self._lock = threading.RLock()
+        self._signature = None
+        self._records = None
+        self._derived = {}
+
+    def _current_signature(self):
+        signature = []
+        for path in (self.path,) + self._watch_paths:
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None) # the loader decides whether a missing file is an error
+        return tuple(signature)
+
+    def disk_version(self):
+        """(mtime_ns, size) of each watched file as it is on disk now, without loading anything."""
+        return self._current_signature()
+
+    @property
+    def version(self):
+        """(mtime_ns, size) of each watched file as last loaded, or None if nothing is loaded yet."""
+        return self._signature
+
+    def records(self):
+        """Returns the loaded records, re-parsing the file first if it changed on disk."""
+        signature = self._current_signature()
+        with self._lock:
+            if signature != self._signature:
+                self._records = self._loader(self.path)
+                self._derived = {}
+                self._signature = signature
+            return self._records
+
+    def derived(self, name, builder):
+        """Returns builder(records), built once per loaded version of the file."""
+        with self._lock:
+            records = self.records()
+            if name not in self._derived:
+                self._derived[name] = builder(records)
+            return self._derived[name]
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(path, loader=_load_json, watch_paths=()):
+    """Returns the shared LeadStore for `path`, creating it on first use."""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = LeadStore(path, loader, watch_paths)
+            _stores[key] = store
+        return store
@@ -0,0 +1,61 @@
+import json
+import pandas as pd
+
+# --- Chunked Lead Reader ---
+# Reads a JSON array of lead records (such as data/enriched_leads.json) a chunk of records at
+# a time, so code that only needs one pass over the corpus (streaming training, see
+# models/train_model.py) never holds more than a chunk in memory.
+
+DEFAULT_CHUNK_SIZE = 50_000
+READ_BLOCK_CHARS = 1 << 20
+
+
+def iter_json_records(path, block_chars=READ_BLOCK_CHARS):
+    """Yields the records of a top-level JSON array one at a time, reading the file in blocks."""
+    decoder = json.JSONDecoder()
+    with open(path, "r") as f:
+        buffer, position, eof = "", 0, False
+        started = False # the opening "[" has been consumed
+
+        def fill():
+            nonlocal buffer, position, eof
+            block = f.read(block_chars)
+            eof = not block
+            buffer = buffer[position:] + block
+            position = 0
+
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position == len(buffer):
+                if eof:
+                    raise ValueError(f"{path}: unexpected end of file in the JSON array")
+                fill()
+                continue
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError(f"{path}: expected a JSON array of records")
+                position, started = position + 1, True
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill() # the record continues in the next block
+                continue
+            position = end
+            yield record
+
+def iter_lead_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yields DataFrames of up to `chunk_size` consecutive leads of a JSON lead file."""
+    chunk = []
+    for record in iter_json_records(path):
+        chunk.append(record)
+        if len(chunk) == chunk_size:
+            yield pd.DataFrame(chunk)
+            chunk = []
+    if chunk:
+        yield pd.DataFrame(chunk)
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+import numpy as np
+from utils.lead_store import get_store
+from utils.features import FEATURE_VERSION, LEGACY_FEATURE_STATS
+
+# --- Precomputed ML Rank Scores ---
+# The ML ranking model only reads lead fields, never the search, so each lead's Rank Score is
+# fixed for a given model and corpus. `python models/train_model.py score` predicts the whole
+# corpus in one batch and stores the column (in corpus order) in data/ml_rank_scores.npz,
+# tagged with the model and corpus versions it was computed for. The ML page then only
+# filters and sorts that column; it falls back to predicting per search while it is stale.
+
+ML_SCORES_FILE = os.path.join("data", "ml_rank_scores.npz")
+
+
+def predict_rank_scores(model, features):
+    """Integer Rank Scores in [0, 100] for a feature frame (utils/features.py), in row order."""
+    return np.clip(model.predict(features), 0, 100).astype(int)
+
+# --- Model Artifact ---
+# ranking_model.pkl holds {"pipeline": fitted sklearn Pipeline, "feature_stats": fitted
+# feature statistics, "feature_version": ...}. Older artifacts are a bare Pipeline; they are
+# served with the statistics serving used before (LEGACY_FEATURE_STATS).
+
+def save_model_artifact(pipeline, feature_stats, path):
+    import joblib
+    joblib.dump({"pipeline": pipeline, "feature_stats": feature_stats, "feature_version": FEATURE_VERSION}, path)
+
+def load_model_artifact(path, mmap_mode=None):
+    """{"pipeline", "feature_stats"} from a model file, including legacy bare-Pipeline files.
+
+    mmap_mode="r" memory-maps the large arrays joblib stored uncompressed (read-only: not for
+    models that will be trained further).
+    """
+    import joblib # unpickling imports sklearn; keep it off the import path of the serving modules
+    artifact = joblib.load(path, mmap_mode=mmap_mode)
+    if not isinstance(artifact, dict):
+        artifact = {"pipeline": artifact, "feature_stats": LEGACY_FEATURE_STATS, "feature_version": 0}
+    return artifact
+
+# --- Versions ---
+
+def _hash_file(path):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()[:16]
+    except FileNotFoundError:
+        return None
+
+def model_version(model_path):
+    """Content hash of a model file (re-hashed only when the file changes), or None if it is missing."""
+    return get_store(model_path, _hash_file).records()
+
+# --- Storage ---
+
+def save_ml_scores(scores, model_version, corpus_version, path=ML_SCORES_FILE):
+    meta = {"model_version": model_version, "corpus_version": corpus_version}
+    arrays = {
+        "meta": np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8),
+        "scores": np.asarray(scores, dtype=np.int16), # 0-100
+    }
+    # Write next to the target and rename so readers never see a half-written file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+def _load_ml_scores(path):
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as archive:
+        meta = json.loads(archive["meta"].tobytes().decode("utf-8"))
+        meta["scores"] = archive["scores"]
+    return meta
+
+def get_ml_scores(model_version, corpus_version, path=ML_SCORES_FILE):
+    """The Rank Score of every corpus lead (corpus order) for this model and corpus, or None if not precomputed."""
+    stored = get_store(path, _load_ml_scores).records()
+    if stored is None or model_version is None:
+        return None
+    if stored["model_version"] != model_version or stored["corpus_version"] != corpus_version:
+        return None
+    return stored["scores"]
@@ -0,0 +1,89 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from utils.flat_forest import flat_model_path_for, load_flat_model
+from utils.ml_scores import load_model_artifact, model_version
+
+# --- Per-purpose Model Registry ---
+# `python models/train_model.py train --per-purpose` trains one ML model per search purpose,
+# each on its own target, next to the general model (models/ranking_model.job_search.pkl,
+# with its flat export and data/ml_rank_scores.job_search.npz). Purposes without their own
+# model are served by the general one. Serving loads a model on first use and keeps only the
+# most recently used ones resident, so memory does not grow with the number of purposes.
+
+DEFAULT_MAX_RESIDENT_MODELS = 2
+
+
+def purpose_slug(purpose):
+    return re.sub(r"[^a-z0-9]+", "_", purpose.lower()).strip("_")
+
+def purpose_path(path, purpose):
+    """The per-purpose variant of a model or scores file: ranking_model.pkl -> ranking_model.<slug>.pkl."""
+    base, extension = os.path.splitext(path)
+    return f"{base}.{purpose_slug(purpose)}{extension}"
+
+def resolve_purpose_paths(model_path, scores_path, purpose):
+    """(model path, scores path) serving `purpose`: its own model when one was trained, else the general one."""
+    if purpose and os.path.exists(purpose_path(model_path, purpose)):
+        return purpose_path(model_path, purpose), purpose_path(scores_path, purpose)
+    return model_path, scores_path
+
+def load_serving_model(model_path):
+    """{"pipeline", "feature_stats"}: from the flat export when it matches the pickle, else the pickle.
+
+    Arrays are memory-mapped (all of the flat export's; from a pickle, those the estimators keep
+    as plain NumPy arrays), so they load lazily and are shared between processes.
+    """
+    flat_path = flat_model_path_for(model_path)
+    # The flat-array export (train_model.py export) predicts with NumPy alone: no sklearn import or unpickling
+    if os.path.exists(flat_path):
+        model = load_flat_model(flat_path)
+        if model.source_version == model_version(model_path) and model.feature_stats is not None:
+            return {"pipeline": model, "feature_stats": model.feature_stats}
+    return load_model_artifact(model_path, mmap_mode="r")
+
+
+class ModelRegistry:
+    """Loads serving models on first use and keeps the `max_models` most recently used ones resident.
+
+    Models are keyed by path and reloaded when the file on disk changes (see model_version).
+    """
+
+    def __init__(self, max_models=DEFAULT_MAX_RESIDENT_MODELS, loader=load_serving_model):
+        self.max_models = max_models
+        self._loader = loader
+        self._models = OrderedDict() # model path -> (model version, model), least recently used first
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def get(self, model_path):
+        """The loaded model at `model_path`; raises FileNotFoundError if there is none."""
+        version = model_version(model_path)
+        with self._lock:
+            entry = self._models.get(model_path)
+            if entry is None or entry[0] != version:
+                entry = (version, self._loader(model_path))
+                self._models[model_path] = entry
+                self.loads += 1
+            self._models.move_to_end(model_path)
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+            return entry[1]
+
+    def resident(self):
+        """Paths of the loaded models, least recently used first."""
+        with self._lock:
+            return list(self._models)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_model_registry(max_models=DEFAULT_MAX_RESIDENT_MODELS):
+    """Returns the process-wide ModelRegistry, creating it on first use."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry(max_models)
+        return _registry
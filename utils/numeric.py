@@ -0,0 +1,48 @@
+import re
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# --- Numeric Normalization ---
+# Lead fields carry numbers as strings such as "$15,000,000", "$1.5M", "250K", "120" or "12%".
+# parse_numeric is the single parser used by ranking, training and serving; each distinct
+# raw string is parsed once and memoized.
+
+# Bump when parsing rules change, so numbers cached on disk (e.g. in snapshots) are re-parsed
+NUMERIC_PARSER_VERSION = 1
+PARSE_CACHE_SIZE = 1 << 18
+
+_NUMBER_PATTERN = re.compile(r"^([-+]?(?:\d+\.?\d*|\.\d+)(?:e[-+]?\d+)?)([kmb]?)%?$", re.IGNORECASE)
+_SUFFIX_MULTIPLIERS = {"": 1, "k": 1e3, "m": 1e6, "b": 1e9}
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_numeric_string(text):
+    """Parses one raw string to a float, or returns None if it is not a number."""
+    cleaned = text.replace(",", "").replace("$", "").replace(" ", "").strip()
+    match = _NUMBER_PATTERN.match(cleaned)
+    if not match:
+        return None
+    number, suffix = match.groups()
+    return float(number) * _SUFFIX_MULTIPLIERS[suffix.lower()]
+
+def parse_numeric(value, default=0):
+    """Converts a raw lead value to a float, returning `default` when it is missing or not a number.
+
+    Handles currency symbols, thousands separators, K/M/B suffixes and trailing percent signs
+    ("12%" -> 12.0).
+    """
+    if value is None or isinstance(value, bool):
+        return default
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return default if np.isnan(value) else float(value)
+    if isinstance(value, str):
+        parsed = _parse_numeric_string(value)
+        return default if parsed is None else parsed
+    return default
+
+def parse_numeric_series(series, default=np.nan):
+    """Vectorized parse_numeric for a pandas Series: each distinct value is parsed once."""
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    table = np.array([parse_numeric(value, default) for value in uniques] + [default], dtype=float)
+    return pd.Series(table[codes], index=series.index, name=series.name) # code -1 (NaN/None) -> default
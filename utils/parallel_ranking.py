@@ -0,0 +1,128 @@
+import argparse
+import heapq
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from utils.columnar import ColumnarLeads
+from utils.ranking_engine import score_leads, top_k_positions
+from utils.search_options import PURPOSES
+
+# --- Parallel Ranking ---
+# Splits a large lead table into row chunks, scores the chunks in a process pool and merges
+# each chunk's local top-K with a k-way merge. Every lead's score only depends on that lead,
+# and ties are broken by lead position everywhere, so the result is exactly the serial ranking.
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+_worker_leads = None # the table each worker scores, installed once per process
+
+
+def _init_worker(leads):
+    global _worker_leads
+    _worker_leads = leads
+
+def _score_chunk(start, stop, purpose, user_inputs, sector, region, top_k, as_of):
+    """Scores rows [start, stop) and returns their local top-k as (positions, scores)."""
+    chunk = _worker_leads.take(np.arange(start, stop))
+    scores = score_leads(chunk, purpose, user_inputs, sector, region, as_of)
+    local = top_k_positions(scores, top_k)
+    return local + start, scores[local]
+
+def _merge_top_k(chunk_results, top_k):
+    """k-way merge of per-chunk rankings ordered by (-score, position)."""
+    streams = [zip((-scores).tolist(), positions.tolist()) for positions, scores in chunk_results]
+    merged = list(itertools.islice(heapq.merge(*streams), top_k)) # stops after top_k (all when None)
+    positions = np.array([position for _, position in merged], dtype=np.intp)
+    scores = np.array([-negative_score for negative_score, _ in merged], dtype=float)
+    return positions, scores
+
+class ParallelRanker:
+    """Process pool bound to one lead table, reusable across many ranking queries.
+
+    Use as a context manager; the table is sent to each worker once, when the pool starts.
+    """
+
+    def __init__(self, leads, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        if not isinstance(leads, ColumnarLeads):
+            leads = ColumnarLeads.from_records(list(leads))
+        self.leads = leads
+        self.workers = workers or os.cpu_count() or 1
+        self.bounds = [(start, min(start + chunk_size, len(leads))) for start in range(0, len(leads), chunk_size)]
+        self._pool = None
+
+    @property
+    def serial(self):
+        return self.workers == 1 or len(self.bounds) <= 1
+
+    def __enter__(self):
+        if not self.serial:
+            self._pool = ProcessPoolExecutor(max_workers=min(self.workers, len(self.bounds)),
+                                             initializer=_init_worker, initargs=(self.leads,))
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def rank_positions(self, purpose, user_inputs, sector, region, top_k=None, as_of=None):
+        """Returns (positions, scores) of the top_k leads, best-first."""
+        if self._pool is None: # serial engine for a single worker/chunk
+            scores = score_leads(self.leads, purpose, user_inputs, sector, region, as_of)
+            positions = top_k_positions(scores, top_k)
+            return positions, scores[positions]
+        futures = [
+            self._pool.submit(_score_chunk, start, stop, purpose, user_inputs, sector, region, top_k, as_of)
+            for start, stop in self.bounds
+        ]
+        chunk_results = [future.result() for future in futures] # in chunk order, for determinism
+        return _merge_top_k(chunk_results, top_k)
+
+    def rank(self, purpose, user_inputs, sector, region, top_k=None, as_of=None):
+        """Ranked lead dicts with "Rank Score", like fetch_data.rank_enriched_leads."""
+        positions, scores = self.rank_positions(purpose, user_inputs, sector, region, top_k, as_of)
+        ranked = []
+        for position, score in zip(positions, scores):
+            lead = self.leads[position]
+            lead["Rank Score"] = float(score)
+            ranked.append(lead)
+        return ranked
+
+def rank_positions_parallel(leads, purpose, user_inputs, sector, region, top_k=None, workers=None,
+                            chunk_size=DEFAULT_CHUNK_SIZE, as_of=None):
+    """One-off parallel ranking: (positions, scores) of the top_k leads, best-first.
+
+    workers defaults to the CPU count; with a single worker or a single chunk the serial
+    engine is used directly.
+    """
+    with ParallelRanker(leads, workers, chunk_size) as ranker:
+        return ranker.rank_positions(purpose, user_inputs, sector, region, top_k, as_of)
+
+def rank_enriched_leads_parallel(leads, purpose, user_inputs, sector, region, top_k=None, workers=None,
+                                 chunk_size=DEFAULT_CHUNK_SIZE, as_of=None):
+    """Parallel counterpart of fetch_data.rank_enriched_leads: ranked lead dicts with "Rank Score"."""
+    with ParallelRanker(leads, workers, chunk_size) as ranker:
+        return ranker.rank(purpose, user_inputs, sector, region, top_k, as_of)
+
+
+if __name__ == "__main__":
+    from utils.fetch_data import get_enriched_table
+
+    parser = argparse.ArgumentParser(description="Rank the full enriched corpus for every purpose using a process pool.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--top-k", type=int, default=1000)
+    parser.add_argument("--output-dir", default="rankings")
+    args = parser.parse_args()
+
+    corpus = get_enriched_table()
+    os.makedirs(args.output_dir, exist_ok=True)
+    with ParallelRanker(corpus, args.workers, args.chunk_size) as ranker: # one pool for all purposes
+        for purpose in PURPOSES:
+            ranked = ranker.rank(purpose, {}, "", "", args.top_k)
+            output_path = os.path.join(args.output_dir, purpose.replace(" ", "_").replace("/", "_").lower() + ".json")
+            with open(output_path, "w") as f:
+                json.dump(ranked, f, indent=2)
+            print(f"{purpose}: wrote top {len(ranked)} of {len(corpus)} leads to {output_path}")
@@ -0,0 +1,95 @@
+import datetime
+import threading
+import time
+from collections import OrderedDict
+
+# --- Ranking Cache ---
+# Memoizes finished rankings so repeated searches (from any session) skip the whole
+# fetch -> enrich -> rank pipeline. Entries are keyed on the corpus version plus a canonical
+# form of the query and the "as-of" day used for date-based scoring, and expire after a TTL.
+
+DEFAULT_MAX_ENTRIES = 128
+DEFAULT_TTL_SECONDS = 15 * 60
+
+
+class RankingCache:
+    """Thread-safe LRU cache with per-entry time-to-live and hit/miss counters."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict() # key -> (expires_at, value), least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key] # expired
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value for key, computing and storing it on a miss."""
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+def resolve_as_of(as_of=None):
+    """The day date-based scores are computed for; defaults to today."""
+    if as_of is None:
+        return datetime.date.today()
+    if isinstance(as_of, datetime.datetime):
+        return as_of.date()
+    return as_of
+
+def make_query_key(corpus_version, sector, region, purpose, user_inputs, as_of, top_k=None):
+    """Canonical, hashable cache key for one ranking query (top_k: None for a full ranking)."""
+    return (
+        corpus_version,
+        sector.lower(), # every sector/region comparison is case-insensitive
+        region.lower(),
+        purpose,
+        tuple(sorted((key, repr(value)) for key, value in user_inputs.items())),
+        resolve_as_of(as_of).isoformat(),
+        top_k,
+    )
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_ranking_cache(name="rules", max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+    """Returns the process-wide RankingCache called `name`, creating it on first use."""
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = RankingCache(max_entries, ttl_seconds)
+            _caches[name] = cache
+        return cache
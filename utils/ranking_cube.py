@@ -0,0 +1,180 @@
+import argparse
+import datetime
+import hashlib
+import itertools
+import json
+import os
+import time
+import numpy as np
+from utils.fetch_data import SEARCH_TOP_K, corpus_version, fetch_slice_positions, get_enriched_table
+from utils.lead_store import get_store
+from utils.ranking_cache import resolve_as_of
+from utils.ranking_engine import SCORING_RULES, RankedLeads, RankingSession, top_k_positions
+from utils.rule_compiler import DEFAULT_RULES_PATH
+from utils.search_options import PURPOSE_INPUT_OPTIONS, PURPOSES, REGIONS, SECTORS
+
+# --- Materialized Ranking Cube ---
+# Every search in app.py is a combination of dropdown options, so the whole query space can
+# be ranked ahead of time. `python -m utils.ranking_cube build` ranks every combination and
+# stores its top-K in data/ranking_cube.npz; the app then serves a search with one dict
+# lookup. Only the inputs the scoring rules actually read are enumerated (the others cannot
+# change a ranking), and identical rankings are stored once.
+# A cube is tied to the corpus version, the scoring rules and the as-of day it was built for;
+# lookups against a stale cube miss, so it is meant to be rebuilt daily and after data loads.
+
+RANKING_CUBE_FILE = os.path.join("data", "ranking_cube.npz")
+DEFAULT_CUBE_TOP_K = SEARCH_TOP_K # as many leads as a live search keeps
+
+
+def rules_version(path=DEFAULT_RULES_PATH):
+    """Short hash of the scoring rule file the rankings were computed with."""
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:16]
+
+RULES_VERSION = rules_version() # of the rules SCORING_RULES was compiled from
+
+def cube_key(sector, region, purpose, user_inputs):
+    """Canonical cube key of a query: inputs the purpose's rules never read, and empty ones, are dropped."""
+    relevant = SCORING_RULES.inputs(purpose)
+    inputs = sorted((key, value) for key, value in user_inputs.items() if key in relevant and value != "")
+    return json.dumps([sector.lower(), region.lower(), purpose, inputs])
+
+def purpose_input_combinations(purpose):
+    """Every distinct user_inputs of `purpose` the form can produce, as far as the scores are concerned.
+
+    Consecutive combinations differ in as few inputs as possible, so a RankingSession walking
+    them re-evaluates few rules.
+    """
+    relevant = SCORING_RULES.inputs(purpose)
+    options = {key: values for key, values in PURPOSE_INPUT_OPTIONS.get(purpose, {}).items() if key in relevant}
+    for values in itertools.product(*options.values()):
+        yield {key: value for key, value in zip(options, values) if value != ""}
+
+def query_space():
+    """(sector, region, purpose, user_inputs) for every query of the search form ("" is "All")."""
+    for sector in [""] + SECTORS:
+        for region in [""] + REGIONS:
+            for purpose in PURPOSES:
+                for user_inputs in purpose_input_combinations(purpose):
+                    yield sector, region, purpose, user_inputs
+
+# --- Building ---
+
+def build_ranking_cube(top_k=DEFAULT_CUBE_TOP_K, as_of=None, path=RANKING_CUBE_FILE):
+    """Ranks every query of query_space() and writes the cube to `path`; returns the number of queries."""
+    as_of = resolve_as_of(as_of)
+    all_leads = get_enriched_table()
+    keys, raw_counts, totals, ranking_ids = [], [], [], []
+    rankings = {} # digest of (positions, scores) -> ranking id, so identical rankings are stored once
+    positions_parts, scores_parts = [], []
+    slices = itertools.groupby(query_space(), key=lambda query: query[:2])
+    for (sector, region), queries in slices:
+        raw_count, slice_positions = fetch_slice_positions(sector, region)
+        session = RankingSession(all_leads.take(slice_positions), sector, region, as_of)
+        for _, _, purpose, user_inputs in queries:
+            ranked = session.rank(purpose, user_inputs)
+            local = top_k_positions(ranked.scores, top_k)
+            positions = slice_positions[local].astype(np.int32)
+            scores = ranked.scores[local]
+            ranking_id = rankings.setdefault(hashlib.sha1(positions.tobytes() + scores.tobytes()).digest(), len(rankings))
+            if ranking_id == len(positions_parts):
+                positions_parts.append(positions)
+                scores_parts.append(scores)
+            keys.append(cube_key(sector, region, purpose, user_inputs))
+            raw_counts.append(raw_count)
+            totals.append(len(slice_positions))
+            ranking_ids.append(ranking_id)
+    meta = {
+        "corpus_version": corpus_version(), "rules_version": RULES_VERSION,
+        "as_of": as_of.isoformat(), "top_k": top_k, "keys": keys,
+    }
+    offsets = np.zeros(len(positions_parts) + 1, dtype=np.int64)
+    np.cumsum([len(part) for part in positions_parts], out=offsets[1:])
+    arrays = {
+        "meta": np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8),
+        "positions": np.concatenate(positions_parts) if positions_parts else np.empty(0, dtype=np.int32),
+        "scores": np.concatenate(scores_parts) if scores_parts else np.empty(0),
+        "offsets": offsets,
+        "ranking_ids": np.array(ranking_ids, dtype=np.int32),
+        "raw_counts": np.array(raw_counts, dtype=np.int64),
+        "totals": np.array(totals, dtype=np.int64),
+    }
+    # Write next to the target and rename so the app never reads a half-written cube
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+    return len(keys)
+
+# --- Serving ---
+
+class RankingCube:
+    """A loaded cube: the top-K ranking of every precomputed query, addressed by cube_key()."""
+
+    def __init__(self, meta, arrays):
+        self.corpus_version = meta["corpus_version"]
+        self.rules_version = meta["rules_version"]
+        self.as_of = datetime.date.fromisoformat(meta["as_of"])
+        self.top_k = meta["top_k"]
+        self._index = {key: i for i, key in enumerate(meta["keys"])}
+        self._arrays = arrays
+
+    def __len__(self):
+        return len(self._index)
+
+    def lookup(self, key):
+        """(raw leads matched, enriched leads ranked, corpus positions, scores) best-first, or None."""
+        i = self._index.get(key)
+        if i is None:
+            return None
+        arrays = self._arrays
+        ranking_id = arrays["ranking_ids"][i]
+        start, stop = arrays["offsets"][ranking_id], arrays["offsets"][ranking_id + 1]
+        return int(arrays["raw_counts"][i]), int(arrays["totals"][i]), arrays["positions"][start:stop], arrays["scores"][start:stop]
+
+def _load_cube(path):
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as archive:
+        arrays = {name: archive[name] for name in archive.files}
+    meta = json.loads(arrays.pop("meta").tobytes().decode("utf-8"))
+    return RankingCube(meta, arrays)
+
+def get_ranking_cube(path=RANKING_CUBE_FILE):
+    """The cube on disk (reloaded when the file changes), or None when none has been built."""
+    return get_store(path, _load_cube).records()
+
+def lookup_ranking(sector, region, purpose, user_inputs, as_of=None, path=RANKING_CUBE_FILE):
+    """Serves one search from the cube, like find_and_rank_leads but limited to the top K.
+
+    Returns (number of raw leads matched, enriched leads ranked, RankedLeads of the top K) or
+    None when there is no cube, it is stale (other corpus version, rules or day), or the query
+    is not in it. The RankedLeads carries no score components.
+    """
+    cube = get_ranking_cube(path)
+    if cube is None or cube.as_of != resolve_as_of(as_of) or cube.rules_version != RULES_VERSION:
+        return None
+    if cube.corpus_version != corpus_version():
+        return None
+    hit = cube.lookup(cube_key(sector, region, purpose, user_inputs))
+    if hit is None:
+        return None
+    raw_count, total, positions, scores = hit
+    return raw_count, total, RankedLeads(get_enriched_table().take(positions), scores)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute the ranking of every search-form query.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build_parser = subcommands.add_parser("build", help="Rank the whole query space into a cube file.")
+    build_parser.add_argument("--top-k", type=int, default=DEFAULT_CUBE_TOP_K)
+    build_parser.add_argument("--as-of", type=datetime.date.fromisoformat, default=None, help="Scoring day, YYYY-MM-DD (default: today)")
+    build_parser.add_argument("--output", default=RANKING_CUBE_FILE)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        started = time.perf_counter()
+        count = build_ranking_cube(args.top_k, args.as_of, args.output)
+        print(f"Ranked {count} queries (top {args.top_k}) into {args.output} "
+              f"({os.path.getsize(args.output) / 1e6:.2f} MB) in {time.perf_counter() - started:.1f}s")
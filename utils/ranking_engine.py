@@ -0,0 +1,345 @@
+import datetime
+import numpy as np
+from utils.columnar import ColumnarLeads
+from utils.keyword_matcher import KeywordMatcher
+from utils.numeric import parse_numeric
+from utils.rule_compiler import RuleContext, load_scoring_rules
+
+# --- Vectorized Ranking Engine ---
+# Scores whole columns of leads at once instead of looping over lead dicts. String rules
+# (lower-casing, keyword checks, date parsing, numeric parsing) run once per *distinct*
+# value of a field and are broadcast back to the leads through the column codes; numeric
+# rules are plain NumPy comparisons. The point rules themselves are data (scoring_rules.json,
+# compiled by utils/rule_compiler.py); this module provides the lead features they read.
+# Points are added in rule order, the order of the original per-lead loop, so the resulting
+# float scores are identical.
+
+# Common and purpose-specific rules, compiled once at import (edit utils/scoring_rules.json)
+SCORING_RULES = load_scoring_rules()
+
+# Lead fields counted by the "completeness" feature
+ESSENTIAL_FIELDS = SCORING_RULES.features["completeness_fields"]
+
+# Keyword classes of the rule file by flag prefix: prefix -> (lead field, matcher of its classes)
+KEYWORD_MATCHERS = {
+    prefix: (spec["field"], KeywordMatcher(spec["classes"]))
+    for prefix, spec in SCORING_RULES.features["keyword_classes"].items()
+}
+
+# Funding tiers, best first: a lead scores the first tier (a "funding" keyword class) it matches
+FUNDING_TIERS = [(tier["class"], tier["points"]) for tier in SCORING_RULES.features["funding_tiers"]]
+
+# --- Helper Functions for Scoring Logic ---
+
+def _score_recent_funding(funding_desc):
+    """Scores based on recent funding status (one matcher pass, cached per distinct string)."""
+    matched = KEYWORD_MATCHERS["funding"][1].match(funding_desc)
+    for tier, points in FUNDING_TIERS:
+        if tier in matched:
+            return points
+    return 0
+
+def _updated_ordinal(updated_date_str):
+    """Day number (date.toordinal) of an 'Updated' value, or -1 when missing/invalid."""
+    try:
+        if updated_date_str:
+            return datetime.datetime.strptime(updated_date_str, "%Y-%m-%d").toordinal()
+    except (ValueError, TypeError): # Handle invalid date formats or missing 'Updated' field
+        pass
+    return -1
+
+# --- Column Access ---
+
+def _map_field(leads, field, func, missing=None):
+    return leads.map_values(field, func, missing)
+
+def _truthy(leads, field):
+    return _map_field(leads, field, bool).astype(bool)
+
+def _has_http_website(leads):
+    return _map_field(leads, "Website", lambda value: isinstance(value, str) and bool(value) and "http" in value).astype(bool)
+
+def _numeric(leads, field):
+    """Parsed numeric value of `field` per lead (utils/numeric.py); 0 where missing or not a number."""
+    if field in leads.numeric_fields:
+        column = leads.numeric(field)
+        return np.where(np.isnan(column), 0.0, column)
+    return _map_field(leads, field, parse_numeric).astype(float)
+
+def _has_class(leads, field, matcher, keyword_class):
+    """Whether each lead's `field` contains a keyword of `keyword_class` (see KeywordMatcher)."""
+    return _map_field(leads, field, lambda value: keyword_class in matcher.match(value)).astype(bool)
+
+def _funding_points(leads):
+    return _map_field(leads, "Recent Funding / Investment", _score_recent_funding, missing="")
+
+# --- Ingest-time Features ---
+
+STATIC_NUMERIC_FIELDS = ["Employees Count", "Revenue", "Year Founded", "Hiring Activity", "Recent Employee Growth %"]
+
+# Lead flags used by the purpose rules that do not depend on the query
+STATIC_FLAG_FIELDS = {
+    "owner_linkedin": "Owner's LinkedIn",
+    "owner_email": "Owner's Email",
+    "owner_phone": "Owner's Phone Number",
+    "owner_title": "Owner's Title",
+    "company_linkedin": "Company LinkedIn",
+    "company_phone": "Company Phone",
+    "website": "Website",
+}
+
+def compute_static_features(leads):
+    """Computes the query-independent parts of the score once per corpus.
+
+    Returns per-lead arrays: "completeness" (the share of ESSENTIAL_FIELDS filled in),
+    "updated_ordinal" (the 'Updated' day, -1 if unusable), the parsed value of each
+    STATIC_NUMERIC_FIELDS field, the STATIC_FLAG_FIELDS flags, the keyword-class flags of the
+    rule file ("category:<class>", "funding:<class>", ...), "http_website" and "funding_points".
+    """
+    filled_essential_fields = np.zeros(len(leads), dtype=np.int64)
+    for field in ESSENTIAL_FIELDS:
+        filled_essential_fields += _map_field(leads, field, lambda value: value not in [None, "", "0", 0]).astype(np.int64)
+    features = {
+        "completeness": filled_essential_fields / len(ESSENTIAL_FIELDS),
+        "updated_ordinal": _map_field(leads, "Updated", _updated_ordinal).astype(np.int64),
+    }
+    for field in STATIC_NUMERIC_FIELDS:
+        features[field] = _numeric(leads, field)
+    for name, field in STATIC_FLAG_FIELDS.items():
+        features[name] = _truthy(leads, field)
+    for prefix, (field, matcher) in KEYWORD_MATCHERS.items():
+        for keyword_class in matcher.classes:
+            features[f"{prefix}:{keyword_class}"] = _has_class(leads, field, matcher, keyword_class)
+    features["http_website"] = _has_http_website(leads)
+    features["funding_points"] = _funding_points(leads)
+    return features
+
+# --- Vectorized Scoring ---
+
+def _prepare(leads):
+    if not isinstance(leads, ColumnarLeads):
+        leads = ColumnarLeads.from_records(list(leads))
+    features = leads.features if leads.features is not None else compute_static_features(leads)
+    return leads, features
+
+def score_leads(leads, purpose, user_inputs, sector, region, as_of=None):
+    """Returns the Rank Score of every lead as a float array (same order as `leads`).
+
+    Recency and company-age rules are evaluated as of `as_of` (a date; defaults to today).
+    Scores only depend on the day, so rankings are stable for a given as_of. Query-independent
+    terms come from `leads.features` when the table carries them (computed at ingest).
+    """
+    return score_components(leads, purpose, user_inputs, sector, region, as_of).scores()
+
+def score_components(leads, purpose, user_inputs, sector, region, as_of=None):
+    """Evaluates every scoring rule of one query and returns their points as ScoreComponents."""
+    leads, features = _prepare(leads)
+    context = RuleContext(leads, features, sector, region, as_of or datetime.date.today(), user_inputs)
+    terms = SCORING_RULES.common_terms(context)
+    SCORING_RULES.add_purpose_terms(terms, purpose, context)
+    return ScoreComponents.from_terms(len(leads), terms)
+
+def profile_components(leads, profiles, sector, region, as_of=None):
+    """ScoreComponents of the same leads for several query profiles, evaluated in one pass.
+
+    Each profile is a dict with "purpose" and optional "user_inputs". Features and the
+    sector/region rules shared by every profile are computed once.
+    """
+    leads, features = _prepare(leads)
+    context = RuleContext(leads, features, sector, region, as_of or datetime.date.today())
+    common = SCORING_RULES.common_terms(context)
+    components = []
+    for profile in profiles:
+        terms = dict(common)
+        SCORING_RULES.add_purpose_terms(terms, profile["purpose"], context.with_inputs(profile.get("user_inputs", {})))
+        components.append(ScoreComponents.from_terms(len(leads), terms))
+    return components
+
+def score_profiles(leads, profiles, sector, region, as_of=None):
+    """Scores the same leads for several query profiles in one pass; returns one array per profile."""
+    return [components.scores() for components in profile_components(leads, profiles, sector, region, as_of)]
+
+# --- Score Components ---
+
+class ScoreComponents:
+    """Points every scoring rule gave every lead for one query (a components x leads matrix).
+
+    Scores are a weighted sum of the components, so re-weighting only re-adds the columns;
+    no rule is evaluated again. Components are added in rule order, which keeps the default
+    (all weights 1) scores identical to the rule-by-rule sum.
+    """
+
+    def __init__(self, names, columns):
+        self.names = list(names)
+        self.columns = columns # shape (len(names), number of leads)
+
+    @classmethod
+    def from_terms(cls, n, terms):
+        columns = np.empty((len(terms), n))
+        for row, points in enumerate(terms.values()):
+            columns[row] = points # scalars broadcast to every lead
+        return cls(terms.keys(), columns)
+
+    def __len__(self):
+        return self.columns.shape[1]
+
+    @property
+    def matrix(self):
+        """Per-lead x per-component contributions (a view)."""
+        return self.columns.T
+
+    def weight_vector(self, weights=None):
+        """Weights aligned with names; `weights` maps component name -> weight (default 1)."""
+        weights = weights or {}
+        return np.array([float(weights.get(name, 1.0)) for name in self.names])
+
+    def scores(self, weights=None):
+        """Weighted Rank Score of every lead, clipped at zero."""
+        score = np.zeros(len(self))
+        for points, weight in zip(self.columns, self.weight_vector(weights)):
+            score += points if weight == 1.0 else points * weight
+        return np.maximum(score, 0) # Ensure score doesn't go negative
+
+    def breakdown(self, position, weights=None):
+        """{component name: weighted points} for the lead at `position`."""
+        points = self.columns[:, position] * self.weight_vector(weights) + 0.0 # no -0.0 for zero weights
+        return dict(zip(self.names, points.tolist()))
+
+    def take(self, positions):
+        return ScoreComponents(self.names, self.columns[:, positions])
+
+    @staticmethod
+    def concatenate(parts):
+        """Stacks the leads of ScoreComponents that share the same components."""
+        return ScoreComponents(parts[0].names, np.concatenate([part.columns for part in parts], axis=1))
+
+# --- Incremental Re-ranking ---
+
+class RankingSession:
+    """Ranking of one lead slice that remembers the points of every rule between queries.
+
+    rank() with new user inputs only re-evaluates the rules that read a changed input (see
+    CompiledRule.inputs); all other points are reused and the total is re-added in rule order,
+    so scores are identical to a full evaluation. Switching purpose keeps the common rules.
+    """
+
+    def __init__(self, leads, sector, region, as_of=None):
+        leads, features = _prepare(leads)
+        self.leads = leads
+        self.sector = sector
+        self.region = region
+        self.as_of = as_of or datetime.date.today()
+        self.purpose = None
+        self.user_inputs = {}
+        self.evaluated = [] # names of the rules the last rank() call evaluated
+        self._context = RuleContext(leads, features, sector, region, self.as_of)
+        self._points = None # per rule of SCORING_RULES.rules(purpose), None where it does not apply
+
+    @classmethod
+    def from_ranking(cls, ranking, purpose, user_inputs, sector, region, as_of=None):
+        """Session seeded with the components of an existing RankedLeads, without re-evaluating any rule."""
+        session = cls(ranking.leads, sector, region, as_of)
+        session.load(purpose, user_inputs, ranking.components)
+        return session
+
+    def load(self, purpose, user_inputs, components):
+        """Adopts the ScoreComponents of a ranking of this slice for purpose/user_inputs (e.g. from a cache)."""
+        # Components hold the applicable rules in rule order, so they map back onto the rule list
+        context = self._context.with_inputs(user_inputs)
+        columns = iter(zip(components.names, components.columns))
+        points = []
+        for rule in SCORING_RULES.rules(purpose):
+            if not rule.applies(context):
+                points.append(None)
+                continue
+            name, column = next(columns)
+            if name != rule.name:
+                raise ValueError(f"Components do not match the rules of {purpose!r}: {name!r} != {rule.name!r}")
+            points.append(column)
+        self.purpose, self.user_inputs, self._points = purpose, dict(user_inputs), points
+        self.evaluated = []
+
+    def rank(self, purpose, user_inputs):
+        """RankedLeads (with components) for `purpose` and `user_inputs`, re-using unaffected rule points."""
+        context = self._context.with_inputs(user_inputs)
+        rules = SCORING_RULES.rules(purpose)
+        changed = {key for key in set(user_inputs) | set(self.user_inputs) if user_inputs.get(key) != self.user_inputs.get(key)}
+        common_count = len(SCORING_RULES.common)
+        points, self.evaluated = [], []
+        for i, rule in enumerate(rules):
+            reusable = self._points is not None and (
+                i < common_count or (purpose == self.purpose and not rule.inputs & changed))
+            if reusable:
+                points.append(self._points[i])
+            else:
+                points.append(rule.points(context))
+                self.evaluated.append(rule.name)
+        self.purpose, self.user_inputs, self._points = purpose, dict(user_inputs), points
+        terms = {rule.name: rule_points for rule, rule_points in zip(rules, points) if rule_points is not None}
+        return RankedLeads.from_components(self.leads, ScoreComponents.from_terms(len(self.leads), terms))
+
+# --- Top-K Selection & Pagination ---
+
+def top_k_positions(scores, k):
+    """Positions of the k best scores, best-first, with ties kept in lead order (like a stable sort).
+
+    Uses a partial partition, so only the selected k positions are ever sorted.
+    """
+    n = len(scores)
+    if k is None or k >= n:
+        return np.argsort(-scores, kind="stable")
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    threshold = np.partition(scores, n - k)[n - k] # k-th largest score
+    above = np.flatnonzero(scores > threshold)
+    tied = np.flatnonzero(scores == threshold)[:k - len(above)] # earliest leads win ties
+    selected = np.sort(np.concatenate([above, tied]))
+    return selected[np.argsort(-scores[selected], kind="stable")]
+
+
+class RankedLeads:
+    """Ranking over a lead table that is only ordered and materialized as far as pages are requested."""
+
+    def __init__(self, leads, scores, components=None, weights=None):
+        self.leads = leads
+        self.scores = scores
+        self.components = components # ScoreComponents behind the scores, when kept
+        self.weights = weights # component weights the scores were computed with (None: all 1)
+        self._order = np.empty(0, dtype=np.intp) # best-first prefix of the full ranking
+
+    def __len__(self):
+        return len(self.scores)
+
+    @property
+    def max_score(self):
+        return float(self.scores.max()) if len(self.scores) else 0.0
+
+    def positions(self, stop):
+        """Lead positions of ranks [0, stop)."""
+        stop = min(stop, len(self))
+        if stop > len(self._order):
+            # Grow the prefix geometrically so paging forward does not re-partition every time
+            self._order = top_k_positions(self.scores, min(len(self), max(stop, 2 * len(self._order))))
+        return self._order[:stop]
+
+    def page(self, cursor=0, limit=100):
+        """Returns (leads for ranks [cursor, cursor + limit), next cursor or None at the end)."""
+        rows = []
+        for position in self.positions(cursor + limit)[cursor:]:
+            lead = self.leads[position]
+            lead["Rank Score"] = float(self.scores[position])
+            rows.append(lead)
+        next_cursor = cursor + limit if cursor + limit < len(self) else None
+        return rows, next_cursor
+
+    @classmethod
+    def from_components(cls, leads, components, weights=None):
+        return cls(leads, components.scores(weights), components, weights)
+
+    def reweighted(self, weights):
+        """The same leads re-ranked with new component weights, without evaluating any rule."""
+        return RankedLeads.from_components(self.leads, self.components, weights)
+
+    def breakdown(self, cursor=0, limit=100):
+        """Per-component points of the leads at ranks [cursor, cursor + limit), like page()."""
+        return [self.components.breakdown(position, self.weights) for position in self.positions(cursor + limit)[cursor:]]
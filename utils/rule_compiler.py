@@ -0,0 +1,288 @@
+import json
+import os
+import numpy as np
+from utils.numeric import parse_numeric
+
+# --- Declarative Scoring Rules ---
+# The ranking rules live in scoring_rules.json as data: for every purpose, an ordered list of
+# named rules, each giving points to leads through first-match "cases". load_scoring_rules
+# compiles the file once into closures over whole columns:
+#   - conditions that only read the query (user inputs, sector) evaluate to a plain bool and
+#     are checked before any lead column is touched, so a rule whose "when" is false costs
+#     nothing and a case whose query condition is false is skipped entirely;
+#   - text conditions run once per distinct value of the field (ColumnarLeads.map_values);
+#   - numeric and flag conditions are NumPy comparisons on the ingest-time features.
+#
+# Rule:      {"name": ..., "when": <query condition>, "points": <operand>}
+#            {"name": ..., "when": ..., "cases": [{"if": <condition>, "points": <operand>}, ...], "else": <operand>}
+#            {"use": <template name>}                  (a rule from the "templates" section)
+#            Names are the score components, so they must be unique per purpose, common rules included.
+# Condition: {"all": [...]}, {"any": [...]}, {"not": <condition>}
+#            {"flag": <feature>}                       (a boolean ingest-time feature)
+#            {"field": <operand>, "op": ">", "value": <operand>}
+#            {"text": <lead field>, "contains" | "equals" | "contains_any_word": <string operand>}
+#            {"text": <lead field>, "contains_any": [<keyword>, ...]}
+#            {"input": <user input>, "lower": true, "equals" | "contains": <string>}
+#            {"query": "sector" | "region", "equals" | "contains": <string>}
+# Operand:   a number, a feature name ("Revenue", "company_age", ...), {"input": <name>, "numeric": true},
+#            {"query": "sector" | "region" | "region_first_word"}, {"add" | "sub" | "mul" | "div": [a, b]},
+#            {"abs": a} or {"if": <query condition>, "then": a, "else": b}
+# Text comparisons are case-insensitive; input conditions compare the raw input unless "lower".
+#
+# The "features" section parameterizes the ingest-time features the rules read (built by
+# ranking_engine.compute_static_features): the fields counted by "completeness", the keyword
+# classes that become "<prefix>:<class>" flags (e.g. "category:crm_fit") and the funding tiers
+# behind "funding_points".
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), "scoring_rules.json")
+
+_COMPARISONS = {
+    ">": np.greater, ">=": np.greater_equal, "<": np.less, "<=": np.less_equal,
+    "==": np.equal, "!=": np.not_equal,
+}
+_ARITHMETIC = {"add": np.add, "sub": np.subtract, "mul": np.multiply, "div": np.divide}
+_TEXT_PREDICATES = {
+    "contains": lambda value: lambda text: value in text,
+    "equals": lambda value: lambda text: text == value,
+    "contains_any_word": lambda value: (lambda words: lambda text: any(word in text for word in words))(value.split()),
+    "contains_any": lambda keywords: lambda text: any(keyword in text for keyword in keywords),
+}
+_STRING_PREDICATES = {
+    "contains": lambda actual, expected: expected in actual,
+    "equals": lambda actual, expected: actual == expected,
+}
+
+
+class RuleContext:
+    """What compiled rules can read for one query: the lead table, its features and the query."""
+
+    def __init__(self, leads, features, sector, region, today, user_inputs=None):
+        self.leads = leads
+        self.features = features
+        self.n = len(leads)
+        self.today = today
+        self.user_inputs = user_inputs or {}
+        region = region.lower()
+        self.query = {"sector": sector.lower(), "region": region, "region_first_word": region.split(" ")[0]}
+        self._derived = {} # day-dependent columns, computed on first use
+
+    def with_inputs(self, user_inputs):
+        """The same leads and sector/region with another profile's user inputs."""
+        context = RuleContext.__new__(RuleContext)
+        context.__dict__.update(self.__dict__)
+        context.user_inputs = user_inputs
+        return context
+
+    def column(self, name):
+        """A per-lead feature, or one of the day-dependent "company_age" / "days_since_update"."""
+        if name in self.features:
+            return self.features[name]
+        if name not in self._derived:
+            if name == "company_age":
+                self._derived[name] = self.today.year - self.features["Year Founded"]
+            elif name == "days_since_update": # 'Updated' values are whole days
+                self._derived[name] = self.today.toordinal() - self.features["updated_ordinal"]
+            else:
+                raise KeyError(f"Unknown lead feature: {name!r}")
+        return self._derived[name]
+
+    def text(self, field, predicate):
+        """predicate applied to the lower-cased text of `field` ("" when absent), per lead."""
+        return self.leads.map_values(field, lambda value: predicate(value.lower() if isinstance(value, str) else ""), missing="").astype(bool, copy=False)
+
+
+class _Compiled:
+    """A compiled condition or operand: evaluate(context) plus whether it reads lead columns."""
+
+    def __init__(self, evaluate, per_lead):
+        self.evaluate = evaluate
+        self.per_lead = per_lead
+
+
+def _constant(value):
+    return _Compiled(lambda context: value, False)
+
+def _compile_operand(spec):
+    if isinstance(spec, bool) or spec is None:
+        raise ValueError(f"Invalid operand: {spec!r}")
+    if isinstance(spec, (int, float)):
+        return _constant(spec)
+    if isinstance(spec, str):
+        return _Compiled(lambda context: context.column(spec), True)
+    if "input" in spec:
+        name = spec["input"]
+        if spec.get("numeric"):
+            return _Compiled(lambda context: parse_numeric(context.user_inputs.get(name, 0)), False)
+        lower = spec.get("lower", False)
+        return _Compiled(lambda context: _input_text(context, name, lower), False)
+    if "query" in spec:
+        name = spec["query"]
+        return _Compiled(lambda context: context.query[name], False)
+    if "abs" in spec:
+        operand = _compile_operand(spec["abs"])
+        return _Compiled(lambda context: np.abs(operand.evaluate(context)), operand.per_lead)
+    if "if" in spec:
+        condition = _compile_condition(spec["if"])
+        then, otherwise = _compile_operand(spec["then"]), _compile_operand(spec.get("else", 0))
+        if condition.per_lead:
+            return _Compiled(lambda context: np.where(condition.evaluate(context), then.evaluate(context), otherwise.evaluate(context)), True)
+        return _Compiled(lambda context: (then if condition.evaluate(context) else otherwise).evaluate(context), then.per_lead or otherwise.per_lead)
+    for name, function in _ARITHMETIC.items():
+        if name in spec:
+            left, right = (_compile_operand(operand) for operand in spec[name])
+            return _Compiled(lambda context: function(left.evaluate(context), right.evaluate(context)), left.per_lead or right.per_lead)
+    raise ValueError(f"Invalid operand: {spec!r}")
+
+def _input_text(context, name, lower):
+    value = context.user_inputs.get(name, "")
+    return value.lower() if lower else value
+
+def _compile_condition(spec):
+    if "all" in spec or "any" in spec:
+        return _compile_combination([_compile_condition(part) for part in spec.get("all", spec.get("any"))], "all" in spec)
+    if "not" in spec:
+        inner = _compile_condition(spec["not"])
+        return _Compiled(lambda context: np.logical_not(inner.evaluate(context)), inner.per_lead)
+    if "flag" in spec:
+        name = spec["flag"]
+        return _Compiled(lambda context: context.column(name), True)
+    if "field" in spec:
+        left, right = _compile_operand(spec["field"]), _compile_operand(spec["value"])
+        compare = _COMPARISONS[spec["op"]]
+        return _Compiled(lambda context: compare(left.evaluate(context), right.evaluate(context)), left.per_lead or right.per_lead)
+    if "text" in spec:
+        field = spec["text"]
+        (kind, value), = [(kind, spec[kind]) for kind in _TEXT_PREDICATES if kind in spec]
+        if kind == "contains_any":
+            keywords = [keyword.lower() for keyword in value]
+            return _Compiled(lambda context: context.text(field, _TEXT_PREDICATES[kind](keywords)), True)
+        operand = _compile_operand(value) if isinstance(value, dict) else _constant(value.lower())
+        return _Compiled(lambda context: context.text(field, _TEXT_PREDICATES[kind](operand.evaluate(context).lower())), True)
+    if "input" in spec or "query" in spec:
+        actual = _compile_operand({key: spec[key] for key in ("input", "query", "lower") if key in spec})
+        (kind, expected), = [(kind, spec[kind]) for kind in _STRING_PREDICATES if kind in spec]
+        return _Compiled(lambda context: _STRING_PREDICATES[kind](actual.evaluate(context), expected), False)
+    raise ValueError(f"Invalid condition: {spec!r}")
+
+def _compile_combination(parts, require_all):
+    """all/any with short-circuiting: query-level parts are decided first, then lead columns."""
+    query_parts = [part for part in parts if not part.per_lead]
+    lead_parts = [part for part in parts if part.per_lead]
+
+    def evaluate(context):
+        for part in query_parts:
+            if bool(part.evaluate(context)) != require_all:
+                return not require_all # decided without reading any lead column
+        result = None
+        for part in lead_parts:
+            value = part.evaluate(context)
+            result = value if result is None else (result & value if require_all else result | value)
+        return require_all if result is None else result
+
+    return _Compiled(evaluate, bool(lead_parts))
+
+
+class CompiledRule:
+    """One named scoring rule: points per lead, or nothing when its query condition is false."""
+
+    def __init__(self, name, when, cases, default, inputs=frozenset()):
+        self.name = name
+        self.when = when
+        self.cases = cases # [(condition, points)], first match wins
+        self.default = default
+        self.inputs = inputs # names of the user inputs the rule reads
+
+    def applies(self, context):
+        """Whether the rule gives points for this query (its "when" only reads the query)."""
+        return self.when is None or bool(self.when.evaluate(context))
+
+    def points(self, context):
+        """Per-lead points (or one number for every lead), or None when the rule does not apply."""
+        if not self.applies(context):
+            return None
+        conditions, choices = [], []
+        default = self.default
+        for condition, points in self.cases:
+            hit = condition.evaluate(context)
+            if np.ndim(hit) == 0: # decided by the query alone
+                if hit:
+                    default = points # every lead left takes this case; later cases never match
+                    break
+                continue # skipped without evaluating its points
+            conditions.append(hit)
+            choices.append(points.evaluate(context))
+        result = default.evaluate(context)
+        for hit, choice in zip(reversed(conditions), reversed(choices)): # earlier cases win
+            result = np.where(hit, choice, result)
+        return result
+
+def _compile_rule(spec, templates):
+    if "use" in spec:
+        spec = {**templates[spec["use"]], **{key: value for key, value in spec.items() if key != "use"}}
+    when = _compile_condition(spec["when"]) if "when" in spec else None
+    if when is not None and when.per_lead:
+        raise ValueError(f"Rule {spec['name']!r}: 'when' may only read the query, not lead fields")
+    if "points" in spec:
+        cases = [(_constant(True), _compile_operand(spec["points"]))]
+    else:
+        cases = [(_compile_condition(case["if"]), _compile_operand(case["points"])) for case in spec["cases"]]
+    return CompiledRule(spec["name"], when, cases, _compile_operand(spec.get("else", 0)), frozenset(_input_names(spec)))
+
+def _input_names(spec):
+    """Every user input a (part of a) rule spec reads."""
+    if isinstance(spec, list):
+        return set().union(*(_input_names(part) for part in spec))
+    if not isinstance(spec, dict):
+        return set()
+    names = {spec["input"]} if "input" in spec else set()
+    return names.union(*(_input_names(value) for value in spec.values()))
+
+
+class ScoringRules:
+    """Compiled rule table: rules for every purpose plus the common rules applied first."""
+
+    def __init__(self, spec):
+        self.features = spec.get("features", {})
+        templates = spec.get("templates", {})
+        self.common = [_compile_rule(rule, templates) for rule in spec["common"]]
+        self.purposes = {
+            purpose: [_compile_rule(rule, templates) for rule in rules]
+            for purpose, rules in spec["purposes"].items()
+        }
+        # Points are reported per rule name (ScoreComponents), so names must be unique per purpose
+        for purpose in [None, *self.purposes]:
+            names = [rule.name for rule in self.rules(purpose)]
+            duplicates = sorted({name for name in names if names.count(name) > 1})
+            if duplicates:
+                where = f"purpose {purpose!r} (with the common rules)" if purpose else "the common rules"
+                raise ValueError(f"Duplicate rule names in {where}: {', '.join(duplicates)}")
+
+    def rules(self, purpose):
+        """The common rules followed by the rules of `purpose`, in the order their points add up."""
+        return self.common + self.purposes.get(purpose, [])
+
+    def inputs(self, purpose):
+        """Names of the user inputs that can change the scores of `purpose`."""
+        return frozenset().union(*(rule.inputs for rule in self.rules(purpose)))
+
+    @staticmethod
+    def _apply(rules, terms, context):
+        for rule in rules:
+            points = rule.points(context)
+            if points is not None:
+                terms[rule.name] = points
+
+    def common_terms(self, context):
+        """{rule name: per-lead points} of the common rules, in rule order."""
+        terms = {}
+        self._apply(self.common, terms, context)
+        return terms
+
+    def add_purpose_terms(self, terms, purpose, context):
+        """Adds the rules of `purpose` to `terms` (in place); unknown purposes add nothing."""
+        self._apply(self.purposes.get(purpose, []), terms, context)
+
+def load_scoring_rules(path=DEFAULT_RULES_PATH):
+    """Reads and compiles a rule file (see the format above)."""
+    with open(path, "r") as f:
+        return ScoringRules(json.load(f))
@@ -0,0 +1,43 @@
+# --- Search Options ---
+# The choices offered by the search form in app.py. Every search is a combination of these,
+# so the query space is finite; the ranking cube (utils/ranking_cube.py) enumerates it.
+
+SECTORS = ["Healthcare", "Construction", "Retail", "Software", "Renewable Energy", "Finance", "Education", "Food & Beverage", "Technology", "Logistics", "Consulting", "Real Estate", "Agriculture", "Pharmaceutical"]
+REGIONS = ["California", "Texas", "Washington", "Oregon", "New York", "Massachusetts", "Florida", "Illinois", "New Jersey"]
+
+PURPOSES = ["Job Search", "Investor Research", "Sales Prospecting", "Merger and Acquisition/Partnership", "Market Research / Competitive Analysis"]
+
+COMPANY_SIZE_OPTIONS = ["", "Small (1-50 employees)", "Medium (51-500 employees)", "Large (500+ employees)"]
+INVESTMENT_STAGE_OPTIONS = ["", "Seed/Angel", "Series A/B", "Growth Equity", "Mature/Public Ready"]
+REVENUE_RANGE_OPTIONS = ["", "Under $1M", "$1M - $5M", "$5M - $10M", "$10M - $50M", "$50M - $100M", "Over $100M"]
+BUYER_TYPE_OPTIONS = ["", "B2B", "B2C", "B2B2C"]
+PRODUCT_CATEGORY_OPTIONS = ["", "CRM Software", "Cloud Security", "HR Software", "Marketing Automation", "Data Analytics Platform", "Financial Advisory", "Supply Chain Management", "Project Management Tools", "E-commerce Solutions", "AI/ML Solutions"]
+ALLIANCE_TYPE_OPTIONS = ["", "Acquisition Target", "Strategic Partner", "Joint Venture"]
+SYNERGY_AREA_OPTIONS = ["", "Market Expansion", "Technology Integration", "Talent Acquisition", "Cost Reduction", "Product Diversification", "Customer Base Access"]
+NICHE_OPTIONS = ["", "Healthcare AI Software", "Sustainable Construction Materials", "Luxury Fashion E-commerce", "Cybersecurity Solutions", "Supply Chain Management Software", "Cloud Infrastructure", "Drug Discovery", "Urban Planning", "Data Strategy Consulting", "Organic Farming", "K-12 Learning Software", "Pharmaceutical Manufacturing", "Industrial Automation", "Wealth Management"]
+COMPETITOR_FOCUS_OPTIONS = ["Direct Competitors", "Adjacent Market Players", "Emerging Disruptors"]
+
+# user_inputs key -> options, per purpose (the first option is the form's default)
+PURPOSE_INPUT_OPTIONS = {
+    "Job Search": {
+        "company_size_preference": COMPANY_SIZE_OPTIONS,
+    },
+    "Investor Research": {
+        "investment_stage": INVESTMENT_STAGE_OPTIONS,
+        "revenue_threshold_valuation": REVENUE_RANGE_OPTIONS,
+    },
+    "Sales Prospecting": {
+        "buyer_type": BUYER_TYPE_OPTIONS,
+        "your_product_category": PRODUCT_CATEGORY_OPTIONS,
+    },
+    "Merger and Acquisition/Partnership": {
+        "target_size_preference": COMPANY_SIZE_OPTIONS,
+        "type_of_alliance": ALLIANCE_TYPE_OPTIONS,
+        "synergy_areas": SYNERGY_AREA_OPTIONS,
+    },
+    "Market Research / Competitive Analysis": {
+        "your_niche": NICHE_OPTIONS,
+        "your_revenue_range": REVENUE_RANGE_OPTIONS,
+        "competitor_focus": COMPETITOR_FOCUS_OPTIONS,
+    },
+}
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import numpy as np
+from utils.columnar import ColumnarLeads
+from utils.numeric import NUMERIC_PARSER_VERSION
+
+# --- Enriched Lead Snapshots ---
+# `python -m utils.snapshot compile` converts data/enriched_leads.json into a typed columnar
+# .npz snapshot next to it. The snapshot records the (mtime, size) of the JSON it was compiled
+# from; loaders use it only while the JSON still has exactly those, and fall back to the JSON
+# otherwise (also when the JSON is replaced by a file with an older mtime).
+
+SNAPSHOT_SUFFIX = ".npz"
+DEFAULT_SOURCE = os.path.join("data", "enriched_leads.json")
+
+
+def snapshot_path_for(json_path):
+    return os.path.splitext(json_path)[0] + SNAPSHOT_SUFFIX
+
+def source_signature(json_path):
+    """[st_mtime_ns, st_size] of a source JSON, or None when it does not exist (as LeadStore compares files)."""
+    try:
+        stat = os.stat(json_path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+def _read_meta(snapshot_path):
+    with np.load(snapshot_path, allow_pickle=False) as archive:
+        return json.loads(archive["meta"].tobytes().decode("utf-8"))
+
+def fresh_snapshot_path(json_path):
+    """Returns the snapshot path for `json_path` if one exists and is not stale, else None.
+
+    A snapshot is fresh when the JSON is absent or still has the mtime and size recorded at
+    compile time.
+    """
+    snapshot_path = snapshot_path_for(json_path)
+    if not os.path.exists(snapshot_path):
+        return None
+    signature = source_signature(json_path)
+    if signature is not None and _read_meta(snapshot_path).get("source_signature") != signature:
+        return None
+    return snapshot_path
+
+def save_snapshot(leads, snapshot_path, source_signature=None):
+    meta = {
+        "fields": leads.fields, "values": {}, "numeric_parser_version": NUMERIC_PARSER_VERSION,
+        "source_signature": source_signature,
+    }
+    arrays = {}
+    for i, field in enumerate(leads.fields):
+        codes, values = leads.column(field)
+        meta["values"][field] = values
+        arrays[f"codes_{i}"] = codes
+        if field in leads.numeric_fields:
+            arrays[f"numeric_{i}"] = leads.numeric(field)
+    arrays["meta"] = np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8)
+    # Write next to the target and rename so readers never see a half-written snapshot
+    tmp_path = snapshot_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, snapshot_path)
+
+def load_snapshot(snapshot_path):
+    with np.load(snapshot_path, allow_pickle=False) as archive:
+        meta = json.loads(archive["meta"].tobytes().decode("utf-8"))
+        codes, numeric = {}, {}
+        for i, field in enumerate(meta["fields"]):
+            codes[field] = archive[f"codes_{i}"]
+            if f"numeric_{i}" in archive.files:
+                numeric[field] = archive[f"numeric_{i}"]
+    if meta.get("numeric_parser_version") != NUMERIC_PARSER_VERSION:
+        numeric = None # parsed with older rules; re-parse from the stored values
+    return ColumnarLeads(meta["fields"], codes, meta["values"], numeric)
+
+def load_enriched_leads(json_path):
+    """Loads enriched leads as a ColumnarLeads table, from the snapshot when it is fresh."""
+    snapshot_path = fresh_snapshot_path(json_path)
+    if snapshot_path:
+        return load_snapshot(snapshot_path)
+    with open(json_path, "r") as f:
+        return ColumnarLeads.from_records(json.load(f))
+
+def load_enriched_frame(json_path):
+    """Loads enriched leads as a DataFrame, from the snapshot when it is fresh."""
+    return load_enriched_leads(json_path).to_frame()
+
+def compile_snapshot(json_path, snapshot_path=None):
+    snapshot_path = snapshot_path or snapshot_path_for(json_path)
+    signature = source_signature(json_path) # taken before reading, so a concurrent rewrite makes it stale
+    with open(json_path, "r") as f:
+        leads = ColumnarLeads.from_records(json.load(f))
+    save_snapshot(leads, snapshot_path, signature)
+    return snapshot_path, len(leads)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage columnar snapshots of the enriched leads corpus.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    compile_parser = subcommands.add_parser("compile", help="Compile an enriched leads JSON file into a snapshot.")
+    compile_parser.add_argument("source", nargs="?", default=DEFAULT_SOURCE)
+    compile_parser.add_argument("--output", default=None, help="Snapshot path (defaults to the source path with .npz)")
+    args = parser.parse_args()
+
+    if args.command == "compile":
+        output_path, count = compile_snapshot(args.source, args.output)
+        print(f"Compiled {count} leads from {args.source} into {output_path} "
+              f"({os.path.getsize(args.source) / 1e6:.2f} MB JSON -> {os.path.getsize(output_path) / 1e6:.2f} MB snapshot)")